@@ -1,12 +1,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import os
+import time
 from datetime import datetime
 from utils import (
     process_submission, predict_with_model, generate_chatbot_response
 )
+from claim_state import append_chat_message
+from serving import ModelServer, load_model_artifact
+from model_registry import ModelRegistry, ModelLoadError
+from risk import get_risk_drivers, assess_risk, RISK_LABELS
+from portfolio import PortfolioStore, PORTFOLIO_DB, SORT_COLUMNS
+from what_if import (
+    WHAT_IF_FEATURES, MAX_VARIANTS, default_grid, what_if_grid, run_what_if, compact_result, chart_data, summarize_what_if
+)
+from report_jobs import ReportJobQueue
+from velocity import VelocityStore
+from shadow import ShadowScorer, SHADOW_MODEL
 
 # Page Config
 st.set_page_config(
@@ -26,14 +37,14 @@ MODELS = {
 
 # --- State Management ---
 if 'page' not in st.session_state:
-    st.session_state.page = 'home' # home, input, result
+    st.session_state.page = 'home' # home, input, result, portfolio
 
 # Respect URL query param for quick navigation (e.g. ?page=input)
 try:
     params = st.experimental_get_query_params()
     if 'page' in params and params['page']:
         requested = params['page'][0]
-        if requested in ('home', 'input', 'result'):
+        if requested in ('home', 'input', 'result', 'portfolio'):
             st.session_state.page = requested
 except Exception:
     pass
@@ -45,6 +56,12 @@ def reset_app():
     st.session_state.page = 'input'
     st.session_state.analysis_done = False
     st.session_state.show_chat = False
+    st.session_state.pop('claim', None)
+    st.session_state.pop('what_if', None)
+    st.session_state.pop('what_if_result', None)
+    st.session_state.pop('report_job', None)
+    st.session_state.pop('shadow_claim', None)
+    st.session_state.pop('model_version', None)
     if "messages" in st.session_state:
         del st.session_state.messages
 
@@ -58,47 +75,51 @@ def go_to_input():
         pass
     st.rerun()
 
-# Load Assets (Cached)
+# Model Registry (Cached): loads models/ once, then hot-swaps new artifacts in the background
 @st.cache_resource
-def load_assets():
-    assets = {}
-    
-    # Load Models
-    for name, filename in MODELS.items():
-        path = os.path.join(MODEL_DIR, filename)
-        if os.path.exists(path):
-            try:
-                assets[name] = joblib.load(path)
-            except Exception as e:
-                st.error(f"Error loading model {name}: {e}")
-                return None
-        else:
-            st.error(f"Model file not found: {path}")
-            return None
-            
-    # Load Encoders
-    encoder_path = os.path.join(MODEL_DIR, "label_encoders.pkl")
-    if os.path.exists(encoder_path):
-        try:
-            assets["encoders"] = joblib.load(encoder_path)
-        except Exception as e:
-             st.error(f"Error loading encoders: {e}")
-             return None
-    else:
-        st.error(f"Encoders not found at {encoder_path}. Please re-run training.")
-        return None
-        
-    return assets
+def model_registry():
+    return ModelRegistry(MODEL_DIR, MODELS).start()
 
-assets = load_assets()
+try:
+    registry = model_registry()
+except ModelLoadError as e:
+    st.error(str(e))
+    registry = None
 
 # Default model selection
 selected_model_name = "XGBoost (Best Performance)"
 
-if assets:
-    model = assets[selected_model_name]
+assets, model = None, None
+if registry is not None:
+    # A claim stays on the version it was assessed with (pinned in process_submission); otherwise the newest
+    bundle = registry.get(st.session_state.get('model_version'))
+    assets = bundle.assets
+    # One shared, thread-limited server per model and version for all sessions
+    model = bundle.server(selected_model_name)
     encoders = assets.get("encoders")
 
+# Shared velocity counters, restored from the last snapshot (or a model_train.py backfill)
+@st.cache_resource
+def velocity_store():
+    return VelocityStore.load()
+
+# Shared background PDF worker pool for all sessions
+@st.cache_resource
+def report_queue():
+    return ReportJobQueue()
+
+# Shadow candidate (FRAUD_SHADOW_MODEL=<file in models/>) scored beside production, off the request path
+@st.cache_resource
+def shadow_scorer():
+    if not SHADOW_MODEL:
+        return None
+    try:
+        candidate = ModelServer(load_model_artifact(os.path.join(MODEL_DIR, SHADOW_MODEL)))
+    except Exception as e:
+        st.warning(f"Shadow model {SHADOW_MODEL} not loaded: {e}")
+        return None
+    return ShadowScorer(selected_model_name, candidate, SHADOW_MODEL)
+
 # Chat dialog handled inline on result page (no floating dialog)
 
 # --- Pages ---
@@ -188,6 +209,13 @@ def render_home_page():
             # experimental_rerun may not exist in some Streamlit versions; stop execution
             # The page state is set to 'input' so the next run will render the form.
             st.stop()
+        if st.button("Portfolio Dashboard", key="home_portfolio"):
+            st.session_state.page = 'portfolio'
+            try:
+                st.experimental_set_query_params(page='portfolio')
+            except Exception:
+                pass
+            st.stop()
 
 
 def render_input_page():
@@ -269,7 +297,8 @@ def render_input_page():
         submitted = st.form_submit_button("Analyze Claim", type="primary")
         
     if submitted and assets:
-        # Use imported process_submission logic
+        # New claims always start on the newest models, even if this session still pins an older one
+        current = registry.current
         process_submission(
              months_as_customer, age, policy_bind_date, policy_state, policy_deductable, policy_annual_premium,
              incident_date, incident_type, collision_type, incident_severity, authorities_contacted, state, city,
@@ -278,9 +307,45 @@ def render_input_page():
              witnesses, police_report, property_damage,
              'MALE', 'MD', 'sales', # Default hidden fields
              umbrella_limit, capital_gains, capital_loss, incident_hour, num_vehicles, bodily_injuries,
-             assets['encoders']
+             current.assets['encoders'], velocity_store(), model_version=current.version
         )
 
+def render_report_result(job):
+    # Final state of a finished job, rendered once per page run (no polling)
+    if job.status == 'done':
+        with open(job.path, "rb") as f:
+            st.download_button("Download PDF", f, file_name=os.path.basename(job.path))
+    else:
+        st.error(f"Report generation failed: {job.error}")
+
+@st.fragment(run_every=1)
+def render_report_progress():
+    # Polls an unfinished report job without rerunning the whole page
+    queue = report_queue()
+    job = queue.get(st.session_state.get('report_job'))
+    if job is None:
+        return
+    if job.finished:
+        # One full rerun renders the result outside this fragment, which stops the polling
+        st.rerun()
+    elif job.status == 'running':
+        st.info("Generating report...")
+    else:
+        st.info(f"Report queued (position {queue.position(job.job_id)})...")
+    
+    stats = queue.stats()
+    st.caption(f"Report queue: {stats['queued']} waiting, {stats['running']} running · "
+               f"median job time {stats['latency_p50']:.2f}s (p95 {stats['latency_p95']:.2f}s)")
+
+def render_report_status():
+    job = report_queue().get(st.session_state.get('report_job'))
+    if job is None:
+        return
+    if job.finished:
+        render_report_result(job)
+    else:
+        render_report_progress()
+
 def render_result_page():
     st.title("Risk Assessment Results")
     
@@ -290,13 +355,15 @@ def render_result_page():
     
     st.markdown("---")
     
-    # Retrieve preprocessed data from session state
-    df_model_input = st.session_state.get('df_model_input')
-    df_input = st.session_state.get('df_input')
+    # Retrieve compact claim record from session state
+    claim = st.session_state.get('claim')
     
     # Dynamically predict with currently selected model (using imported function)
-    if df_model_input is not None and model is not None:
+    if claim is not None and model is not None:
+        df_model_input = claim.model_frame()
+        t0 = time.perf_counter()
         probability = predict_with_model(df_model_input, model)
+        production_ms = (time.perf_counter() - t0) * 1000
     else:
         probability = 0.0
         
@@ -307,39 +374,20 @@ def render_result_page():
     
     with col1:
         # Key Drivers (calculate first for risk assessment)
-        drivers = []
         # Re-calc heuristics for display
-        if df_input is not None:
-            if df_input['days_since_policy_bind'].iloc[0] < 30:
-                drivers.append(f"Recent Policy (Bind < 30 days)")
-            if st.session_state.get('police_report') == "NO" and st.session_state.get('total_claim_amount') > 20000:
-                drivers.append("High Value Claim without Police Report")
-            if st.session_state.get('incident_severity') == "Major Damage" and st.session_state.get('witnesses') == 0:
-                drivers.append("Major Incident with No Witnesses")
-            if st.session_state.get('incident_type') == "Single Vehicle Collision":
-                 drivers.append("Single Vehicle Incident Category")
+        drivers = get_risk_drivers(claim) if claim is not None else []
         
         # Store drivers for global chat context
         st.session_state['drivers'] = drivers
         
         # Determine risk level based on both model probability and heuristic drivers
-        num_drivers = len(drivers)
-        if probability > 0.7 or num_drivers >= 3:
-            risk_color = "red"
-            risk_label = "HIGH RISK"
-            risk_description = "High"
-        elif probability > 0.3 or num_drivers >= 2:
-            risk_color = "orange" 
-            risk_label = "MODERATE RISK"
-            risk_description = "Medium"
-        elif probability > 0.1 or num_drivers >= 1:
-            risk_color = "#FFD700"  # Gold/yellow
-            risk_label = "LOW-MODERATE RISK"
-            risk_description = "Low-Medium"
-        else:
-            risk_color = "green"
-            risk_label = "LOW RISK"
-            risk_description = "Low"
+        risk_color, risk_label, risk_description = assess_risk(probability, len(drivers))
+        
+        # Shadow-score each assessment once (reruns of the same claim are not resubmitted)
+        shadow = shadow_scorer()
+        if shadow is not None and claim is not None and st.session_state.get('shadow_claim') is not claim:
+            shadow.submit(df_model_input, probability, production_ms, len(drivers))
+            st.session_state['shadow_claim'] = claim
         
         # Score Card
         st.markdown(f"""
@@ -358,17 +406,22 @@ def render_result_page():
                 st.warning(f"⚠️ {d}")
         else:
             st.success("No standard heuristic red flags detected.")
+        
+        if shadow is not None:
+            stats = shadow.stats()
+            st.caption(f"Shadow {shadow.candidate_name}: {stats['label_agreement']:.1%} label agreement over "
+                       f"{stats['compared']:,} claims · latency p50 {stats['production_ms_p50']:.1f} ms production / "
+                       f"{stats['candidate_ms_p50']:.1f} ms candidate")
 
         # PDF Generation
         st.markdown("---")
         st.subheader("Official Report")
         if st.button("Generate & Download PDF"):
-            from pdf_gen import generate_pdf_report
-            with st.spinner("Generating Report..."):
-                pdf_path = generate_pdf_report(df_input, probability, risk_label, drivers)
-            
-            with open(pdf_path, "rb") as f:
-                st.download_button("Download PDF", f, file_name=os.path.basename(pdf_path))
+            # Rendered on the shared worker pool; this session keeps running
+            st.session_state['report_job'] = report_queue().submit(claim.input_frame(), probability, risk_label, drivers)
+        
+        if st.session_state.get('report_job'):
+            render_report_status()
 
     with col2:
         # Chatbot Section
@@ -387,27 +440,167 @@ def render_result_page():
 
         # Chat input
         if prompt := st.chat_input("Type your question here..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            append_chat_message(st.session_state.messages, "user", prompt)
             
             # Get context
-            df_input = st.session_state.get('df_input')
+            claim = st.session_state.get('claim')
             probability = st.session_state.get('probability', 0.0)
             drivers = st.session_state.get('drivers', [])
+            what_if = st.session_state.get('what_if')
             
             # Generate response
-            response = generate_chatbot_response(prompt, df_input, probability, drivers)
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            response = generate_chatbot_response(prompt, claim, probability, drivers, what_if)
+            append_chat_message(st.session_state.messages, "assistant", response)
             st.rerun()
 
+    # What-If Analysis (all scenarios scored in one predict_proba call)
+    st.markdown("---")
+    st.subheader("What-If Analysis")
+    if claim is not None and model is not None:
+        w1, w2, w3 = st.columns(3)
+        primary = w1.selectbox("Vary", list(WHAT_IF_FEATURES), key="what_if_primary")
+        secondary = w2.selectbox("Against", ["(none)"] + [f for f in WHAT_IF_FEATURES if f != primary], key="what_if_secondary")
+        points = w3.slider("Grid Points", 10, 200, 100, key="what_if_points")
+        
+        selected = [primary] + ([secondary] if secondary != "(none)" else [])
+        grid = what_if_grid(claim, selected, points)
+        column, requested = default_grid(claim, primary, points)
+        if len(grid[column]) < len(requested):
+            st.caption(f"{primary} uses {len(grid[column])} points to stay within {MAX_VARIANTS:,} scenarios.")
+        
+        if st.button("Run What-If"):
+            labels = {WHAT_IF_FEATURES[label][0]: label for label in selected}
+            try:
+                result = run_what_if(claim, grid, model, assets['encoders'])
+            except Exception as e:
+                st.error(f"What-If Error: {e}")
+            else:
+                # Only the grid and probabilities stay in the session; the chart is rebuilt from them
+                st.session_state['what_if_result'] = compact_result(result, grid)
+                st.session_state['what_if'] = summarize_what_if(result, labels)
+        
+        if 'what_if_result' in st.session_state:
+            compact = st.session_state['what_if_result']
+            curve = chart_data(compact)
+            if np.issubdtype(next(iter(compact['grid'].values())).dtype, np.number):
+                st.line_chart(curve)
+            else:
+                st.bar_chart(curve)
+            st.caption(st.session_state['what_if'])
+
+# --- Portfolio Aggregates (cached per store version and filter set) ---
+PORTFOLIO_PAGE_SIZE = 50
+
+@st.cache_data(show_spinner=False)
+def portfolio_aggregates(db_path, version, filters):
+    store = PortfolioStore(db_path)
+    filters = dict(filters)
+    return {
+        'summary': store.summary(filters),
+        'risk': store.breakdown('risk_label', filters),
+        'type': store.breakdown('incident_type', filters),
+        'state': store.breakdown('incident_state', filters),
+        'drivers': store.top_drivers(filters),
+    }
+
+@st.cache_data(show_spinner=False)
+def portfolio_page(db_path, version, filters, sort_by, ascending, page):
+    return PortfolioStore(db_path).load_page(dict(filters), sort_by, ascending, page, PORTFOLIO_PAGE_SIZE)
+
+def render_portfolio_page():
+    st.title("Portfolio Dashboard")
+
+    if st.button("Back to Home"):
+        st.session_state.page = 'home'
+        st.rerun()
+
+    store = PortfolioStore(PORTFOLIO_DB)
+    if not store.exists():
+        st.info("No batch-scored claims yet. Run `python src/score_batch.py --input <claims.csv>` to populate the portfolio.")
+        return
+    version = store.version()
+
+    # Filters (pushed down to SQL; tuples keep them hashable for caching)
+    options = store.filter_options()
+    f1, f2, f3 = st.columns(3)
+    risk_filter = f1.multiselect("Risk Level", [r for r in RISK_LABELS if r in options['risk_label']])
+    type_filter = f2.multiselect("Incident Type", options['incident_type'])
+    state_filter = f3.multiselect("Incident State", options['incident_state'])
+    filters = (
+        ('risk_label', tuple(risk_filter)),
+        ('incident_type', tuple(type_filter)),
+        ('incident_state', tuple(state_filter)),
+    )
+
+    agg = portfolio_aggregates(PORTFOLIO_DB, version, filters)
+    summary = agg['summary']
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Claims", f"{summary['claims']:,}")
+    m2.metric("Mean Fraud Probability", f"{summary['mean_probability']:.1%}")
+    m3.metric("Total Claimed", f"${summary['total_amount']:,.0f}")
+
+    st.markdown("---")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.subheader("Risk Level Distribution")
+        st.bar_chart(agg['risk'].groupby('risk_label')['n'].sum().reindex(RISK_LABELS).dropna())
+    with c2:
+        st.subheader("Top Risk Drivers")
+        st.bar_chart(agg['drivers'].set_index('driver')['n'])
+
+    c3, c4 = st.columns(2)
+    with c3:
+        st.subheader("By Incident Type")
+        st.bar_chart(agg['type'].pivot(index='incident_type', columns='risk_label', values='n').fillna(0))
+    with c4:
+        st.subheader("By Incident State")
+        st.bar_chart(agg['state'].pivot(index='incident_state', columns='risk_label', values='n').fillna(0))
+
+    st.markdown("---")
+
+    # Paginated claim table
+    st.subheader("Scored Claims")
+    t1, t2, t3 = st.columns(3)
+    sort_by = t1.selectbox("Sort By", SORT_COLUMNS)
+    ascending = t2.toggle("Ascending", value=False)
+    num_pages = max(1, -(-summary['claims'] // PORTFOLIO_PAGE_SIZE))
+    page = t3.number_input(f"Page (of {num_pages:,})", min_value=1, max_value=num_pages, value=1) - 1
+
+    st.dataframe(
+        portfolio_page(PORTFOLIO_DB, version, filters, sort_by, ascending, page),
+        hide_index=True
+    )
+
+# --- Model Version Status ---
+
+def _format_mb(mb):
+    return f"{mb:.0f} MB" if mb is not None else "n/a"
+
+def render_model_status():
+    status = registry.status()
+    st.sidebar.caption(f"Models v{status['version']} · loaded {status['loaded_at']:%Y-%m-%d %H:%M:%S}")
+    swap = status['last_swap']
+    if swap:
+        st.sidebar.caption(f"Last swap {swap['load_seconds']:.1f}s · peak RSS {_format_mb(swap['rss_peak_mb'])} "
+                           f"(before {_format_mb(swap['rss_before_mb'])}, after {_format_mb(swap['rss_after_mb'])})")
+    if status['last_error']:
+        st.sidebar.warning(status['last_error'])
+
 # --- Main App Logic ---
 
 def main():
+    if registry is not None:
+        render_model_status()
     if st.session_state.page == 'home':
         render_home_page()
     elif st.session_state.page == 'input':
         render_input_page()
     elif st.session_state.page == 'result':
         render_result_page()
+    elif st.session_state.page == 'portfolio':
+        render_portfolio_page()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,84 @@
+# bench_serving.py
+#
+# Concurrent-session load test for the shared model server. Each simulated
+# session scores single claims back to back, as the result page does, and the
+# script reports latency percentiles for each serving configuration.
+#
+# Usage: python src/bench_serving.py [--sessions 32] [--requests 50] [--model xgboost.pkl]
+
+import argparse
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from claim_state import ClaimRecord
+from serving import ModelServer, CPU_COUNT
+from bench_session_memory import sample_fields
+
+MODEL_DIR = "models/"
+
+
+def build_vectors(n, encoders):
+    vectors = []
+    for i in range(n):
+        claim = ClaimRecord(**sample_fields(i))
+        vectors.append(claim.encode(encoders))
+    return vectors
+
+
+def run_load(server, vectors, sessions, requests):
+    latencies = [[] for _ in range(sessions)]
+    start_barrier = threading.Barrier(sessions)
+
+    def session(idx):
+        start_barrier.wait()
+        for r in range(requests):
+            vector = vectors[(idx * requests + r) % len(vectors)]
+            t0 = time.perf_counter()
+            server.predict_proba(vector.reshape(1, -1))
+            latencies[idx].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    all_ms = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    return {
+        'p50': np.percentile(all_ms, 50),
+        'p95': np.percentile(all_ms, 95),
+        'p99': np.percentile(all_ms, 99),
+        'throughput': len(all_ms) / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for model serving")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--model", default="xgboost.pkl")
+    args = parser.parse_args()
+
+    encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+    vectors = build_vectors(256, encoders)
+
+    configs = {
+        "all cores, unbounded": dict(threads_per_call=CPU_COUNT, max_concurrency=args.sessions),
+        "1 thread, bounded": dict(threads_per_call=1),
+        "1 thread, batched": dict(threads_per_call=1, batching=True),
+    }
+
+    print(f"{args.model}: {args.sessions} sessions x {args.requests} requests, {CPU_COUNT} cores")
+    print(f"{'config':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, kwargs in configs.items():
+        server = ModelServer(joblib.load(os.path.join(MODEL_DIR, args.model)), **kwargs)
+        server.predict_proba(vectors[0].reshape(1, -1))  # warm up
+        stats = run_load(server, vectors, args.sessions, args.requests)
+        server.close()
+        print(f"{name:<24}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{stats['throughput']:>10.0f}")
@@ -0,0 +1,96 @@
+# bench_session_memory.py
+#
+# Measures per-session memory of the claim state kept in st.session_state.
+# Compares the legacy layout (two DataFrames + scalar copies + uncapped chat)
+# with the compact ClaimRecord layout at 1, 100 and 1000 simulated sessions.
+#
+# Usage: python src/bench_session_memory.py  (from the repository root)
+
+import os
+import tracemalloc
+import joblib
+import pandas as pd
+
+from claim_state import ClaimRecord, append_chat_message, DATE_COLUMNS
+
+MODEL_DIR = "models/"
+SESSION_COUNTS = (1, 100, 1000)
+CHAT_TURNS = 60  # user + assistant messages per simulated session
+
+
+def sample_fields(i):
+    return dict(
+        months_as_customer=12 + i % 200, age=35, policy_bind_date=pd.Timestamp(2020, 1, 1),
+        policy_state="OH", policy_deductable=1000, policy_annual_premium=1000.0,
+        umbrella_limit=0, insured_sex="MALE", insured_education_level="MD",
+        insured_occupation="sales", insured_hobbies="sleeping", insured_relationship="husband",
+        capital_gains=0, capital_loss=0, incident_date=pd.Timestamp(2021, 1, 1) + pd.Timedelta(days=i % 300),
+        incident_type="Single Vehicle Collision", collision_type="Side Collision",
+        incident_severity="Major Damage", authorities_contacted="Police", incident_state="NY",
+        incident_city="Springfield", incident_hour_of_the_day=12, number_of_vehicles_involved=1,
+        property_damage="YES", bodily_injuries=1, witnesses=0, police_report_available="NO",
+        total_claim_amount=50000 + i, injury_claim=5000, property_claim=5000, vehicle_claim=40000 + i,
+        auto_make="Saab", auto_model="92x", auto_year=2010
+    )
+
+
+def chat_messages(capped):
+    messages = [{"role": "assistant", "content": "👋 Hi! I've analyzed the claim. What would you like to know?"}]
+    for turn in range(CHAT_TURNS // 2):
+        if capped:
+            append_chat_message(messages, "user", f"What is the premium? ({turn})")
+            append_chat_message(messages, "assistant", "The **Premium** for this claim is **$1,000.00**.")
+        else:
+            messages.append({"role": "user", "content": f"What is the premium? ({turn})"})
+            messages.append({"role": "assistant", "content": "The **Premium** for this claim is **$1,000.00**."})
+    return messages
+
+
+def legacy_session(i, encoders):
+    """Session state layout before ClaimRecord: DataFrames and scalar duplicates"""
+    claim = ClaimRecord(**sample_fields(i))
+    claim.encode(encoders)
+    df_input = claim.input_frame()
+    df_model_input = df_input.drop(list(DATE_COLUMNS), axis=1).astype(object)
+    df_model_input.loc[0] = claim.model_vector
+    return {
+        'analysis_done': True,
+        'df_input': df_input,
+        'df_model_input': df_model_input,
+        'police_report': claim.police_report_available,
+        'incident_severity': claim.incident_severity,
+        'witnesses': claim.witnesses,
+        'incident_type': claim.incident_type,
+        'total_claim_amount': claim.total_claim_amount,
+        'messages': chat_messages(capped=False),
+    }
+
+
+def compact_session(i, encoders):
+    claim = ClaimRecord(**sample_fields(i))
+    claim.encode(encoders)
+    return {
+        'analysis_done': True,
+        'claim': claim,
+        'messages': chat_messages(capped=True),
+    }
+
+
+def measure(factory, n, encoders):
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    sessions = [factory(i, encoders) for i in range(n)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    return current - base, peak - base
+
+
+if __name__ == "__main__":
+    encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+
+    print(f"{'layout':<10}{'sessions':>10}{'total KiB':>12}{'per session KiB':>18}{'peak KiB':>12}")
+    for name, factory in (("legacy", legacy_session), ("compact", compact_session)):
+        for n in SESSION_COUNTS:
+            current, peak = measure(factory, n, encoders)
+            print(f"{name:<10}{n:>10}{current / 1024:>12.1f}{current / 1024 / n:>18.2f}{peak / 1024:>12.1f}")
@@ -0,0 +1,89 @@
+# bench_tree_engine.py
+#
+# Compares pickled tree ensembles with their array-backed exports from
+# tree_engine.py: load time, model footprint, batch throughput and the
+# maximum predict_proba difference.
+#
+# Usage: python src/bench_tree_engine.py [--claims data/claims.csv] [--rows 100000]
+
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from claim_state import ClaimRecord, engineer_features, encode_frame
+from tree_engine import CompiledTrees, compile_model
+from bench_session_memory import sample_fields
+
+MODEL_DIR = "models/"
+BATCH_SIZES = (1, 100, 10_000)
+
+
+def load_matrix(path, rows, encoders):
+    if path:
+        raw = pd.read_csv(path, nrows=rows)
+        return encode_frame(engineer_features(raw), encoders)
+    claims = [ClaimRecord(**sample_fields(i)) for i in range(rows)]
+    return pd.DataFrame(np.vstack([c.encode(encoders) for c in claims]),
+                        columns=claims[0].model_frame().columns)
+
+
+def timed_load(loader, path):
+    t0 = time.perf_counter()
+    model = loader(path)
+    return model, time.perf_counter() - t0
+
+
+def model_bytes(model):
+    """Resident size of the model's node data (tree arrays live outside tracemalloc's view)"""
+    if isinstance(model, CompiledTrees):
+        return model.nbytes
+    if hasattr(model, 'get_booster'):
+        return len(model.get_booster().save_raw('ubj'))
+    state = [est.tree_.__getstate__() for est in model.estimators_]
+    return sum(s['nodes'].nbytes + s['values'].nbytes for s in state)
+
+
+def throughput(model, X, batch):
+    X = X.iloc[:max(batch, min(len(X), 10 * batch))]
+    t0 = time.perf_counter()
+    n = 0
+    while time.perf_counter() - t0 < 1.0:
+        for start in range(0, len(X), batch):
+            model.predict_proba(X.iloc[start:start + batch])
+            n += len(X.iloc[start:start + batch])
+    return n / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark compiled tree inference against pickled models")
+    parser.add_argument("--claims", help="Raw claims CSV (defaults to synthetic sample claims)")
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+    X = load_matrix(args.claims, args.rows, encoders)
+
+    tmp_dir = tempfile.mkdtemp()
+    for filename in ("random_forest.pkl", "xgboost.pkl"):
+        pkl_path = os.path.join(MODEL_DIR, filename)
+        npz_path = os.path.splitext(pkl_path)[0] + ".npz"
+        if not os.path.exists(npz_path):
+            # Export to a scratch file so the benchmark doesn't switch the app to the compiled model
+            npz_path = os.path.join(tmp_dir, os.path.basename(npz_path))
+            compile_model(joblib.load(pkl_path)).save(npz_path)
+
+        pickled, pkl_load = timed_load(joblib.load, pkl_path)
+        compiled, npz_load = timed_load(CompiledTrees.load, npz_path)
+        diff = np.abs(pickled.predict_proba(X) - compiled.predict_proba(X)).max()
+
+        print(f"\n{filename}  (max |predict_proba diff| = {diff:.2e})")
+        print(f"{'':<10}{'file KiB':>10}{'load ms':>10}{'model KiB':>11}" + "".join(f"{f'rows/s @{b}':>16}" for b in BATCH_SIZES))
+        for name, model, path, load in (("pickled", pickled, pkl_path, pkl_load),
+                                        ("compiled", compiled, npz_path, npz_load)):
+            rates = "".join(f"{throughput(model, X, b):>16,.0f}" for b in BATCH_SIZES)
+            print(f"{name:<10}{os.path.getsize(path) / 1024:>10.0f}{load * 1000:>10.1f}{model_bytes(model) / 1024:>11.0f}{rates}")
@@ -0,0 +1,153 @@
+import pandas as pd
+import numpy as np
+
+from velocity import VELOCITY_COLUMNS
+
+# --- Claim Schema ---
+# Raw claim columns in the order the models were trained on. Column names keep the
+# training CSV spelling; attribute names replace '-' so they can live in __slots__.
+INPUT_COLUMNS = (
+    'months_as_customer', 'age', 'policy_bind_date', 'policy_state', 'policy_deductable',
+    'policy_annual_premium', 'umbrella_limit', 'insured_sex', 'insured_education_level',
+    'insured_occupation', 'insured_hobbies', 'insured_relationship', 'capital-gains',
+    'capital-loss', 'incident_date', 'incident_type', 'collision_type', 'incident_severity',
+    'authorities_contacted', 'incident_state', 'incident_city', 'incident_hour_of_the_day',
+    'number_of_vehicles_involved', 'property_damage', 'bodily_injuries', 'witnesses',
+    'police_report_available', 'total_claim_amount', 'injury_claim', 'property_claim',
+    'vehicle_claim', 'auto_make', 'auto_model', 'auto_year'
+)
+
+ENGINEERED_COLUMNS = (
+    'days_since_policy_bind', 'incident_month', 'incident_day_of_week',
+    'injury_claim_ratio', 'property_claim_ratio', 'vehicle_claim_ratio'
+)
+
+DATE_COLUMNS = ('policy_bind_date', 'incident_date')
+
+CATEGORICAL_COLUMNS = (
+    'policy_state', 'insured_sex', 'insured_education_level', 'insured_occupation',
+    'insured_hobbies', 'insured_relationship', 'incident_type', 'collision_type',
+    'incident_severity', 'authorities_contacted', 'incident_state', 'incident_city',
+    'property_damage', 'police_report_available', 'auto_make', 'auto_model'
+)
+
+# Feature order expected by the models (dates are dropped after feature engineering)
+MODEL_COLUMNS = tuple(c for c in INPUT_COLUMNS + ENGINEERED_COLUMNS if c not in DATE_COLUMNS)
+
+
+def _attr(column):
+    return column.replace('-', '_')
+
+
+class ClaimRecord:
+    """Compact per-session claim: raw fields as slots plus the encoded model vector"""
+    __slots__ = tuple(_attr(c) for c in INPUT_COLUMNS + ENGINEERED_COLUMNS) + ('model_vector', 'velocity')
+
+    def __init__(self, **fields):
+        for column in INPUT_COLUMNS:
+            setattr(self, _attr(column), fields[_attr(column)])
+        self.model_vector = None
+        self.velocity = None  # {VELOCITY_COLUMNS: value} once observed by a VelocityStore
+        self._engineer_features()
+
+    def _engineer_features(self):
+        self.days_since_policy_bind = (self.incident_date - self.policy_bind_date).days
+        self.incident_month = self.incident_date.month
+        self.incident_day_of_week = self.incident_date.dayofweek
+
+        if self.total_claim_amount > 0:
+            self.injury_claim_ratio = self.injury_claim / self.total_claim_amount
+            self.property_claim_ratio = self.property_claim / self.total_claim_amount
+            self.vehicle_claim_ratio = self.vehicle_claim / self.total_claim_amount
+        else:
+            self.injury_claim_ratio = 0
+            self.property_claim_ratio = 0
+            self.vehicle_claim_ratio = 0
+
+    def get(self, column):
+        return getattr(self, _attr(column))
+
+    __getitem__ = get
+
+    def encode(self, encoders):
+        """Label-encode categoricals into a float vector in MODEL_COLUMNS order"""
+        vector = np.zeros(len(MODEL_COLUMNS), dtype=np.float64)
+        for i, column in enumerate(MODEL_COLUMNS):
+            value = self.get(column)
+            if column in CATEGORICAL_COLUMNS:
+                le = encoders.get(column) if encoders else None
+                if le is None:
+                    continue
+                try:
+                    # Handle '?' inputs -> 'nan' -> text, unseen values -> 0
+                    value = 'nan' if value == '?' else str(value)
+                    vector[i] = le.transform([value])[0] if value in le.classes_ else 0
+                except Exception:
+                    vector[i] = 0
+            else:
+                vector[i] = value
+        self.model_vector = vector
+        return vector
+
+    # --- DataFrame Views (built on demand, never stored in session state) ---
+    def input_frame(self):
+        """Single-row DataFrame of raw and engineered fields (plus velocity features when set)"""
+        frame = {c: [self.get(c)] for c in INPUT_COLUMNS + ENGINEERED_COLUMNS}
+        frame.update({c: [v] for c, v in (self.velocity or {}).items()})
+        return pd.DataFrame(frame)
+
+    def model_frame(self):
+        """Single-row encoded DataFrame ready for predict_proba"""
+        frame = pd.DataFrame(self.model_vector.reshape(1, -1), columns=list(MODEL_COLUMNS))
+        for column, value in (self.velocity or {}).items():
+            frame[column] = float(value)
+        return frame
+
+
+# --- Batch Counterparts (vectorized over many claims) ---
+def engineer_features(df):
+    """Add ENGINEERED_COLUMNS to a frame of raw claims (vectorized ClaimRecord features)"""
+    df = df.copy()
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column])
+    df['days_since_policy_bind'] = (df['incident_date'] - df['policy_bind_date']).dt.days
+    df['incident_month'] = df['incident_date'].dt.month
+    df['incident_day_of_week'] = df['incident_date'].dt.dayofweek
+
+    total = df['total_claim_amount'].where(df['total_claim_amount'] > 0)
+    for part in ('injury', 'property', 'vehicle'):
+        df[f'{part}_claim_ratio'] = (df[f'{part}_claim'] / total).fillna(0)
+    return df
+
+
+def encode_frame(df, encoders):
+    """Encoded model matrix (as a DataFrame in MODEL_COLUMNS order) for engineered claims"""
+    out = pd.DataFrame(index=df.index)
+    for column in MODEL_COLUMNS:
+        if column in CATEGORICAL_COLUMNS:
+            le = encoders.get(column) if encoders else None
+            if le is None:
+                out[column] = 0.0
+                continue
+            values = df[column].astype(str).replace('?', 'nan')
+            codes = {c: i for i, c in enumerate(le.classes_)}
+            out[column] = values.map(codes).fillna(0).astype(np.float64)
+        else:
+            out[column] = df[column].astype(np.float64)
+    for column in VELOCITY_COLUMNS:
+        if column in df.columns:
+            out[column] = df[column].astype(np.float64)
+    return out
+
+
+# --- Chat History ---
+MAX_CHAT_MESSAGES = 40
+
+
+def append_chat_message(messages, role, content, limit=MAX_CHAT_MESSAGES):
+    """Append a chat message, dropping the oldest turns (but keeping the greeting) past the cap"""
+    messages.append({"role": role, "content": content})
+    overflow = len(messages) - limit
+    if overflow > 0:
+        del messages[1:1 + overflow]
+    return messages
@@ -0,0 +1,191 @@
+# generate_claims.py
+#
+# Synthetic claim generator for scale and load testing. Categorical values are
+# sampled from the vocabularies in models/label_encoders.pkl and numeric fields
+# stay within the ranges the input form allows. Output is written chunk by
+# chunk, so memory is bounded by --chunksize regardless of --rows.
+#
+# The same --seed and --chunksize always produce the same file.
+#
+# Usage: python src/generate_claims.py --rows 1000000 --output data/claims.csv [--fraud-rate 0.25] [--seed 42]
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from claim_state import INPUT_COLUMNS, CATEGORICAL_COLUMNS
+
+MODEL_DIR = "models/"
+OUTPUT_COLUMNS = ('policy_number',) + INPUT_COLUMNS + ('fraud_reported',)
+FORMATS = ('csv', 'parquet', 'jsonl')
+
+# Makes and their models as they appear in the training data; restricted to the encoder vocabulary at load time
+AUTO_MODELS = {
+    'Accura': ['MDX', 'RSX', 'TL'], 'Audi': ['A3', 'A5'], 'BMW': ['3 Series', 'M5', 'X5', 'X6'],
+    'Chevrolet': ['Malibu', 'Silverado', 'Tahoe'], 'Dodge': ['Neon', 'RAM'], 'Ford': ['Escape', 'F150', 'Fusion'],
+    'Honda': ['Accord', 'CRV', 'Civic'], 'Jeep': ['Grand Cherokee', 'Wrangler'], 'Mercedes': ['C300', 'E400', 'ML350'],
+    'Nissan': ['Maxima', 'Pathfinder', 'Ultima'], 'Saab': ['92x', '93', '95'], 'Suburu': ['Forrestor', 'Impreza', 'Legacy'],
+    'Toyota': ['Camry', 'Corolla', 'Highlander'], 'Volkswagen': ['Jetta', 'Passat'],
+}
+
+# Relative weight multipliers applied to categorical values for fraudulent claims
+FRAUD_WEIGHTS = {
+    'incident_severity': {'Major Damage': 6.0},
+    'insured_hobbies': {'chess': 8.0, 'cross-fit': 6.0},
+    'police_report_available': {'NO': 2.0, 'nan': 2.0},
+    'property_damage': {'nan': 1.5},
+    'authorities_contacted': {'nan': 0.5},
+}
+
+# Numeric choices not covered by the encoder vocabularies
+DEDUCTIBLES = np.array([500, 1000, 2000])
+MAX_VEHICLES_MULTI = 4
+
+
+def load_vocabularies(encoders):
+    """Encoder classes per categorical column; the 'nan' class is emitted as '?' like the form does"""
+    return {col: np.array(encoders[col].classes_) for col in CATEGORICAL_COLUMNS if col in encoders}
+
+
+def _weights(values, column, fraud):
+    w = np.ones(len(values))
+    if fraud:
+        for value, mult in FRAUD_WEIGHTS.get(column, {}).items():
+            w[values == value] *= mult
+    return w / w.sum()
+
+
+def _sample(rng, values, column, is_fraud):
+    """Sample a categorical column, using the fraud-weighted distribution where is_fraud"""
+    out = rng.choice(values, size=len(is_fraud), p=_weights(values, column, False))
+    n_fraud = int(is_fraud.sum())
+    if n_fraud and column in FRAUD_WEIGHTS:
+        out[is_fraud] = rng.choice(values, size=n_fraud, p=_weights(values, column, True))
+    return out
+
+
+def generate_chunk(rng, n, start_id, vocab, fraud_rate):
+    """Generate n synthetic raw claims as a DataFrame in OUTPUT_COLUMNS order"""
+    is_fraud = rng.random(n) < fraud_rate
+    df = {col: _sample(rng, values, col, is_fraud) for col, values in vocab.items()}
+
+    # Keep auto_model consistent with auto_make where the vocabulary allows it
+    if 'auto_make' in df and 'auto_model' in vocab:
+        known = set(vocab['auto_model'])
+        models = df['auto_model']
+        for make, make_models in AUTO_MODELS.items():
+            make_models = [m for m in make_models if m in known]
+            mask = df['auto_make'] == make
+            if make_models and mask.any():
+                models[mask] = rng.choice(make_models, size=int(mask.sum()))
+
+    # Policy
+    df['policy_number'] = np.arange(start_id, start_id + n)
+    df['months_as_customer'] = rng.integers(0, 480, n)
+    df['age'] = np.clip(19 + df['months_as_customer'] // 12 + rng.integers(0, 25, n), 18, 80)
+    df['policy_deductable'] = rng.choice(DEDUCTIBLES, n)
+    df['policy_annual_premium'] = np.round(np.clip(rng.normal(1250, 250, n), 400, 2500), 2)
+    df['umbrella_limit'] = np.where(rng.random(n) < 0.2, rng.integers(1, 11, n) * 1_000_000, 0)
+    df['capital-gains'] = np.where(rng.random(n) < 0.45, rng.integers(1, 101, n) * 1000, 0)
+    df['capital-loss'] = np.where(rng.random(n) < 0.45, -rng.integers(1, 112, n) * 1000, 0)
+
+    # Dates: incidents in 2015-2024, bound anywhere up to 25 years earlier (fraud skews recent)
+    incident = np.datetime64('2015-01-01') + rng.integers(0, 3650, n).astype('timedelta64[D]')
+    bind_days = np.where(is_fraud & (rng.random(n) < 0.3), rng.integers(0, 60, n), rng.integers(0, 9000, n))
+    df['incident_date'] = pd.to_datetime(incident).strftime('%Y-%m-%d')
+    df['policy_bind_date'] = pd.to_datetime(incident - bind_days.astype('timedelta64[D]')).strftime('%Y-%m-%d')
+
+    # Incident
+    df['incident_hour_of_the_day'] = rng.integers(0, 24, n)
+    multi = df['incident_type'] == 'Multi-vehicle Collision' if 'incident_type' in df else np.zeros(n, bool)
+    if 'incident_type' in df and 'collision_type' in df:
+        # No collision for parked cars and thefts, recorded as '?' in the source data
+        df['collision_type'][np.isin(df['incident_type'], ['Parked Car', 'Vehicle Theft'])] = 'nan'
+    df['number_of_vehicles_involved'] = np.where(multi, rng.integers(2, MAX_VEHICLES_MULTI + 1, n), 1)
+    df['bodily_injuries'] = rng.integers(0, 3, n)
+    df['witnesses'] = np.where(is_fraud, rng.integers(0, 2, n), rng.integers(0, 4, n))
+
+    # Financials: components sum to the total claim amount
+    total = np.round(np.where(is_fraud, rng.lognormal(10.9, 0.5, n), rng.lognormal(10.6, 0.7, n)), -1)
+    total = np.clip(total, 100, 150_000)
+    shares = rng.dirichlet((1.0, 1.0, 6.0), n)
+    df['injury_claim'] = np.round(total * shares[:, 0], -1)
+    df['property_claim'] = np.round(total * shares[:, 1], -1)
+    df['vehicle_claim'] = total - df['injury_claim'] - df['property_claim']
+    df['total_claim_amount'] = total
+
+    df['auto_year'] = rng.integers(1995, 2025, n)
+    df['fraud_reported'] = np.where(is_fraud, 'Y', 'N')
+
+    frame = pd.DataFrame(df)[list(OUTPUT_COLUMNS)]
+    return frame.replace('nan', '?')
+
+
+class ChunkWriter:
+    """Appends DataFrame chunks to a CSV, Parquet or JSONL file"""
+
+    def __init__(self, path, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self._parquet = None
+        self._first = True
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, chunk):
+        if self.fmt == 'csv':
+            chunk.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        elif self.fmt == 'jsonl':
+            with open(self.path, 'w' if self._first else 'a') as f:
+                chunk.to_json(f, orient='records', lines=True)
+        else:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def generate(path, rows, fmt='csv', fraud_rate=0.25, seed=42, chunksize=100_000, encoders=None):
+    if encoders is None:
+        encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+    vocab = load_vocabularies(encoders)
+
+    writer = ChunkWriter(path, fmt)
+    try:
+        for index, start in enumerate(range(0, rows, chunksize)):
+            rng = np.random.default_rng([seed, index])
+            writer.write(generate_chunk(rng, min(chunksize, rows - start), start, vocab, fraud_rate))
+            yield min(start + chunksize, rows)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic insurance claims")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the output file extension")
+    parser.add_argument("--fraud-rate", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.')
+    t0 = time.perf_counter()
+    for written in generate(args.output, args.rows, fmt, args.fraud_rate, args.seed, args.chunksize):
+        print(f"Generated {written:,} / {args.rows:,} claims ({time.perf_counter() - t0:.1f}s)")
@@ -0,0 +1,222 @@
+# model_distill.py
+#
+# Latency-budgeted training mode. Trains the model_train.py XGBoost
+# configuration (300 trees, depth 6) as the teacher, then builds smaller
+# candidates and measures AUC against single-claim inference time:
+#   - pruned: the first k boosting rounds of the teacher (booster slices), with k from
+#     early stopping on a validation split plus a fixed grid of round counts
+#   - distilled: shallow XGBoost students fit to the teacher's probabilities
+# It prints the Pareto front of test AUC against measured microseconds per
+# claim (pickle and compiled tree_engine paths) and saves the most accurate
+# candidate that fits --budget-us on the chosen --engine.
+#
+# Features come from the app pipeline (claim_state.engineer_features /
+# encode_frame with models/label_encoders.pkl) plus the velocity features
+# backfilled as in model_train.py, so the output can be served as-is: pass
+# --output models/xgboost.pkl to promote it.
+#
+# Usage: python src/model_distill.py --data insurance_claims.csv --budget-us 100 [--engine compiled] [--output models/xgboost_budget.pkl]
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import roc_auc_score
+from imblearn.over_sampling import SMOTE
+import xgboost as xgb
+from xgboost import XGBClassifier
+
+from claim_state import engineer_features, encode_frame
+from tree_engine import compile_model
+from velocity import VelocityStore
+
+MODEL_DIR = "models/"
+
+TEACHER_PARAMS = dict(
+    n_estimators=300,
+    max_depth=6,
+    learning_rate=0.1,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    eval_metric='auc',
+    random_state=42
+)
+EARLY_STOPPING_PATIENCE = 20
+ROUND_GRID = (10, 25, 50, 100, 200, 300)
+STUDENT_SHAPES = ((2, 25), (2, 50), (3, 25), (3, 50), (4, 50), (4, 100))  # (max_depth, n_estimators)
+LATENCY_REPEATS = 200  # calls per timing round
+LATENCY_ROUNDS = 5     # best round is kept, as timeit does, to damp scheduler noise
+USE_VELOCITY_FEATURES = True  # keep in step with model_train.py
+
+
+# -------------------------
+# Data
+# -------------------------
+def load_dataset(path, encoders):
+    raw = pd.read_csv(path)
+    df = engineer_features(raw)
+    if USE_VELOCITY_FEATURES:
+        # A fresh store, so the app's live counters in data/velocity_state.pkl are left alone
+        df = df.join(VelocityStore().backfill(df))
+    X = encode_frame(df, encoders)
+    y = (raw['fraud_reported'].astype(str) == 'Y').astype(int).to_numpy()
+    return X, y
+
+
+def split(X, y):
+    """60/20/20 train / validation (early stopping) / test (reported AUC), stratified"""
+    X_train, X_rest, y_train, y_rest = train_test_split(X, y, test_size=0.4, random_state=42, stratify=y)
+    X_val, X_test, y_val, y_test = train_test_split(X_rest, y_rest, test_size=0.5, random_state=42, stratify=y_rest)
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+# -------------------------
+# Measurement
+# -------------------------
+def latency_us(predict, rows):
+    """Single-claim latency in microseconds: the lowest per-round median over LATENCY_ROUNDS rounds"""
+    predict(rows[0])  # warm up
+    medians = []
+    for _ in range(LATENCY_ROUNDS):
+        times = []
+        for i in range(LATENCY_REPEATS):
+            row = rows[i % len(rows)]
+            t0 = time.perf_counter()
+            predict(row)
+            times.append(time.perf_counter() - t0)
+        medians.append(np.median(times))
+    return float(min(medians) * 1e6)
+
+
+def early_stopping_round(val_auc, patience=EARLY_STOPPING_PATIENCE):
+    """Number of rounds early stopping would keep: best round before `patience` rounds without improvement"""
+    best, best_round = -np.inf, 0
+    for i, auc in enumerate(val_auc):
+        if auc > best:
+            best, best_round = auc, i
+        elif i - best_round >= patience:
+            break
+    return best_round + 1
+
+
+def pareto_front(candidates, key):
+    """Candidates no other candidate beats on both `key` latency and AUC, fastest first"""
+    front = []
+    for c in sorted(candidates, key=lambda c: (c[key], -c['auc'])):
+        if not front or c['auc'] > front[-1]['auc']:
+            front.append(c)
+    return front
+
+
+# -------------------------
+# Candidates
+# -------------------------
+def as_classifier(booster):
+    """Load a booster into the sklearn wrapper so the app, ModelServer and tree_engine serve it like any XGBClassifier"""
+    model = XGBClassifier()
+    model.load_model(booster.save_raw('json'))
+    return model
+
+
+def train_student(X_train, soft, depth, rounds):
+    """Shallow XGBoost fit to the teacher's probabilities (binary:logistic accepts soft labels)"""
+    booster = xgb.train(
+        {'objective': 'binary:logistic', 'max_depth': depth, 'eta': 0.2, 'seed': 42},
+        xgb.DMatrix(X_train, label=soft), num_boost_round=rounds
+    )
+    return as_classifier(booster)
+
+
+def candidate_models(teacher, X_train, stop_round):
+    """{name: (kind, rounds, max_depth, model)} for every pruned and distilled candidate"""
+    models = {}
+    booster = teacher.get_booster()
+    for k in sorted(set(r for r in ROUND_GRID if r <= TEACHER_PARAMS['n_estimators']) | {stop_round}):
+        name = f"pruned-{k}" + (" (early stop)" if k == stop_round else "")
+        models[name] = ('pruned', k, TEACHER_PARAMS['max_depth'], as_classifier(booster[:k]))
+
+    soft = teacher.predict_proba(X_train)[:, 1]
+    for depth, rounds in STUDENT_SHAPES:
+        models[f"distilled-d{depth}-{rounds}"] = ('distilled', rounds, depth, train_student(X_train, soft, depth, rounds))
+    return models
+
+
+def evaluate(models, X_test, y_test):
+    # Single-claim inputs in the shape each engine receives on the result page
+    frames = [X_test.iloc[[i]] for i in range(min(len(X_test), 50))]
+    arrays = [f.to_numpy() for f in frames]
+    candidates = []
+    for name, (kind, rounds, depth, model) in models.items():
+        compiled = compile_model(model)
+        candidates.append({
+            'name': name, 'kind': kind, 'rounds': rounds, 'max_depth': depth,
+            'auc': float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+            'xgboost_us': latency_us(model.predict_proba, frames),
+            'compiled_us': latency_us(compiled.predict_proba, arrays),
+        })
+    return candidates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency-budgeted pruning and distillation")
+    parser.add_argument("--data", default="insurance_claims.csv", help="Labelled claims CSV (training layout)")
+    parser.add_argument("--budget-us", type=float, required=True, help="Per-claim inference budget in microseconds")
+    parser.add_argument("--engine", choices=("compiled", "xgboost"), default="compiled",
+                        help="Serving path the budget applies to: compiled .npz (tree_engine) or the pickle")
+    parser.add_argument("--output", default=os.path.join(MODEL_DIR, "xgboost_budget.pkl"))
+    parser.add_argument("--report", default=os.path.join(MODEL_DIR, "pareto_front.json"))
+    args = parser.parse_args()
+    key = f"{args.engine}_us"
+
+    encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+    X, y = load_dataset(args.data, encoders)
+    X_train, X_val, X_test, y_train, y_val, y_test = split(X, y)
+
+    # SMOTE on the training split only, as in model_train.py
+    X_train, y_train = SMOTE(random_state=42).fit_resample(X_train, y_train)
+
+    # -------------------------
+    # Teacher + early stopping curve
+    # -------------------------
+    teacher = XGBClassifier(**TEACHER_PARAMS)
+    teacher.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    stop_round = early_stopping_round(teacher.evals_result()['validation_0']['auc'])
+    print(f"Early stopping keeps {stop_round} of {TEACHER_PARAMS['n_estimators']} rounds")
+
+    models = candidate_models(teacher, X_train, stop_round)
+    candidates = evaluate(models, X_test, y_test)
+    front = pareto_front(candidates, key)
+
+    print(f"\n{'candidate':<24}{'test AUC':>10}{'xgboost us':>12}{'compiled us':>13}{'pareto':>8}")
+    for c in sorted(candidates, key=lambda c: c[key]):
+        print(f"{c['name']:<24}{c['auc']:>10.4f}{c['xgboost_us']:>12.0f}{c['compiled_us']:>13.0f}"
+              f"{'*' if c in front else '':>8}")
+
+    within = [c for c in front if c[key] <= args.budget_us]
+    if not within:
+        print(f"\nNo candidate meets the {args.budget_us:.0f} us budget; fastest is {front[0][key]:.0f} us.")
+        choice = None
+    else:
+        choice = max(within, key=lambda c: c['auc'])
+        model = models[choice['name']][3]
+        joblib.dump(model, args.output)
+        # The app serves models/<name>.npz in place of models/<name>.pkl when present
+        npz_path = os.path.splitext(args.output)[0] + ".npz"
+        if args.engine == "compiled":
+            compile_model(model).save(npz_path)
+        elif os.path.exists(npz_path):
+            os.remove(npz_path)  # a stale export would keep shadowing the new pickle
+            print(f"Removed stale {npz_path}")
+        print(f"\nChose {choice['name']} (AUC {choice['auc']:.4f}, {choice[key]:.0f} us {args.engine}) -> {args.output}")
+
+    with open(args.report, "w") as f:
+        json.dump({'budget_us': args.budget_us, 'engine': args.engine, 'early_stopping_round': stop_round,
+                   'candidates': candidates, 'pareto_front': front,
+                   'chosen': choice['name'] if choice else None}, f, indent=2)
+    print(f"Pareto front written to {args.report}")
@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from claim_state import ClaimRecord, CATEGORICAL_COLUMNS
+from serving import ModelServer, load_model_artifact
+from velocity import VELOCITY_COLUMNS
+
+# --- Hot Model Reload ---
+# The registry watches the model artifacts in models/ and, when they change,
+# loads and validates the new set on a background thread, then swaps it in
+# with one reference assignment. New assessments use the newest version;
+# sessions with an assessment in progress keep the version they started on.
+RELOAD_POLL_SECONDS = float(os.environ.get("FRAUD_RELOAD_POLL_SECONDS", 10))
+# Optional ceiling on process RSS during a reload (0 = no limit). A reload that
+# would cross it is skipped and reported instead of loaded.
+RELOAD_MAX_MB = float(os.environ.get("FRAUD_RELOAD_MAX_MB", 0))
+LOAD_OVERHEAD = 2.0  # pickle bytes are read into memory once while the objects are built
+RSS_SAMPLE_SECONDS = 0.02
+ENCODERS_FILE = "label_encoders.pkl"
+
+# Validation claim scored by every model before a swap (the input form defaults)
+VALIDATION_CLAIM = dict(
+    months_as_customer=12, age=35, policy_bind_date=pd.Timestamp(2020, 1, 1),
+    policy_state="OH", policy_deductable=1000, policy_annual_premium=1000.0,
+    umbrella_limit=0, insured_sex="MALE", insured_education_level="MD",
+    insured_occupation="sales", insured_hobbies="sleeping", insured_relationship="husband",
+    capital_gains=0, capital_loss=0, incident_date=pd.Timestamp(2021, 1, 1),
+    incident_type="Single Vehicle Collision", collision_type="Side Collision",
+    incident_severity="Minor Damage", authorities_contacted="Police", incident_state="NY",
+    incident_city="Springfield", incident_hour_of_the_day=12, number_of_vehicles_involved=1,
+    property_damage="YES", bodily_injuries=1, witnesses=0, police_report_available="YES",
+    total_claim_amount=50000, injury_claim=5000, property_claim=5000, vehicle_claim=40000,
+    auto_make="Saab", auto_model="92x", auto_year=2010
+)
+
+
+class ModelLoadError(Exception):
+    pass
+
+
+def rss_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable, None where neither is)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _mb(nbytes):
+    return nbytes / 2**20 if nbytes is not None else None
+
+
+class _PeakSampler:
+    """Samples RSS on a side thread and keeps the maximum (unpickling peaks are transient)"""
+
+    def __init__(self):
+        self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        rss = rss_bytes()
+        if rss is not None:
+            self.peak = max(self.peak or 0, rss)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self._sample()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+class ModelBundle:
+    """One loaded version of every served model plus the encoders they were trained with"""
+
+    def __init__(self, version, assets, fingerprint, artifact_bytes):
+        self.version = version
+        self.assets = assets  # {model name: model, 'encoders': encoders}
+        self.fingerprint = fingerprint
+        self.artifact_bytes = artifact_bytes
+        self.loaded_at = datetime.now()
+        self._servers = {}
+        self._lock = threading.Lock()
+
+    def server(self, name):
+        """Shared ModelServer for one model of this version, created on first use"""
+        with self._lock:
+            if name not in self._servers:
+                self._servers[name] = ModelServer(self.assets[name])
+            return self._servers[name]
+
+    def close(self):
+        with self._lock:
+            for server in self._servers.values():
+                server.close()
+
+
+class ModelRegistry:
+    """Serves the newest validated model bundle and hot-swaps new artifacts in the background.
+
+    At most two bundles are resident: the current one and either the one it
+    replaced (kept so in-flight sessions can finish on it) or the one being
+    loaded. The replaced bundle is released before the next load starts, so
+    sessions still pinned to it move to the current version.
+    """
+
+    def __init__(self, model_dir, models, poll_seconds=RELOAD_POLL_SECONDS, max_memory_mb=RELOAD_MAX_MB):
+        self.model_dir = model_dir
+        self.models = dict(models)  # {display name: filename}
+        self.poll_seconds = poll_seconds
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._previous = None
+        self._pending = None  # fingerprint seen changed once; loaded when it is still the same next poll
+        self._rejected = None  # fingerprint that failed to load or validate; not retried until it changes
+        self._next_version = 1
+        self._thread = None
+        self._stop = threading.Event()
+        self.swaps = 0
+        self.last_error = None
+        self.last_swap = None  # memory and timing report of the latest swap
+        self.current = self._load(self._fingerprint())
+
+    # --- Artifacts ---
+    def _paths(self):
+        paths = []
+        for filename in self.models.values():
+            path = os.path.join(self.model_dir, filename)
+            paths += [path, os.path.splitext(path)[0] + ".npz"]
+        return paths + [os.path.join(self.model_dir, ENCODERS_FILE)]
+
+    def _fingerprint(self):
+        """(path, mtime, size) of every artifact that exists"""
+        out = []
+        for path in self._paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            out.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(out)
+
+    def _load(self, fingerprint):
+        assets = {}
+        for name, filename in self.models.items():
+            path = os.path.join(self.model_dir, filename)
+            if not (os.path.exists(path) or os.path.exists(os.path.splitext(path)[0] + ".npz")):
+                raise ModelLoadError(f"Model file not found: {path}")
+            try:
+                assets[name] = load_model_artifact(path)
+            except Exception as e:
+                raise ModelLoadError(f"Error loading model {name}: {e}") from e
+
+        encoder_path = os.path.join(self.model_dir, ENCODERS_FILE)
+        if not os.path.exists(encoder_path):
+            raise ModelLoadError(f"Encoders not found at {encoder_path}. Please re-run training.")
+        try:
+            assets["encoders"] = joblib.load(encoder_path)
+        except Exception as e:
+            raise ModelLoadError(f"Error loading encoders: {e}") from e
+
+        bundle = ModelBundle(self._next_version, assets, fingerprint, sum(size for _, _, size in fingerprint))
+        self._validate(bundle)
+        self._next_version += 1
+        return bundle
+
+    def _validate(self, bundle):
+        """Warm every model with one prediction on VALIDATION_CLAIM and check the output is a probability"""
+        encoders = bundle.assets["encoders"]
+        missing = [c for c in CATEGORICAL_COLUMNS if c not in encoders]
+        if missing:
+            raise ModelLoadError(f"Encoders missing columns: {', '.join(missing)}")
+        claim = ClaimRecord(**VALIDATION_CLAIM)
+        claim.velocity = dict.fromkeys(VELOCITY_COLUMNS, 0)
+        claim.encode(encoders)
+        X = claim.model_frame()
+        for name in self.models:
+            try:
+                proba = np.asarray(bundle.server(name).predict_proba(X))
+            except Exception as e:
+                raise ModelLoadError(f"Validation prediction failed for {name}: {e}") from e
+            if proba.shape != (1, 2) or not np.all(np.isfinite(proba)) or not 0.0 <= proba[0, 1] <= 1.0:
+                raise ModelLoadError(f"Validation prediction for {name} is not a probability: {proba!r}")
+
+    # --- Serving ---
+    def get(self, version=None):
+        """Bundle for a pinned version while it is resident, else the current one"""
+        with self._lock:
+            previous, current = self._previous, self.current
+        if previous is not None and version == previous.version:
+            return previous
+        return current
+
+    # --- Reload ---
+    def check(self):
+        """One poll: reload once a changed fingerprint has been stable for a full poll interval"""
+        fingerprint = self._fingerprint()
+        if fingerprint == self.current.fingerprint or fingerprint == self._rejected:
+            self._pending = None
+            return False
+        if fingerprint != self._pending:
+            self._pending = fingerprint  # still being written, or just finished: wait one more poll
+            return False
+        self._pending = None
+        return self.reload(fingerprint)
+
+    def reload(self, fingerprint=None):
+        with self._reload_lock:
+            fingerprint = fingerprint or self._fingerprint()
+            incoming = sum(size for _, _, size in fingerprint)
+            # Without an RSS source the ceiling is checked against the incoming artifacts alone
+            if self.max_memory and (rss_bytes() or 0) + incoming * LOAD_OVERHEAD > self.max_memory:
+                self.last_error = (f"Reload skipped: {incoming / 2**20:.0f} MB of artifacts would exceed "
+                                   f"the {self.max_memory / 2**20:.0f} MB limit")
+                return False
+
+            # Release the bundle the current one replaced, so only two versions are ever resident
+            with self._lock:
+                released, self._previous = self._previous, None
+            if released is not None:
+                released.close()
+            del released
+
+            rss_before = rss_bytes()
+            t0 = time.perf_counter()
+            try:
+                with _PeakSampler() as sampler:
+                    bundle = self._load(fingerprint)
+            except ModelLoadError as e:
+                self.last_error = str(e)
+                self._rejected = fingerprint
+                return False
+
+            with self._lock:
+                self._previous, self.current = self.current, bundle
+            self.swaps += 1
+            self.last_error = None
+            self.last_swap = {
+                'version': bundle.version,
+                'load_seconds': time.perf_counter() - t0,
+                'artifact_mb': incoming / 2**20,
+                'rss_before_mb': _mb(rss_before),
+                'rss_peak_mb': _mb(sampler.peak),
+                'rss_after_mb': _mb(rss_bytes()),
+            }
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                self.last_error = f"Reload check failed: {e}"
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        current = self.current
+        return {
+            'version': current.version,
+            'loaded_at': current.loaded_at,
+            'previous_version': self._previous.version if self._previous is not None else None,
+            'swaps': self.swaps,
+            'last_error': self.last_error,
+            'last_swap': self.last_swap,
+        }
@@ -10,6 +10,8 @@ from sklearn.metrics import classification_report
 from imblearn.over_sampling import SMOTE
 from xgboost import XGBClassifier
 
+from velocity import VelocityStore, VELOCITY_STATE
+
 # -------------------------
 # Load Dataset
 # -------------------------
@@ -28,6 +30,18 @@ for col in df.columns:
     else:
         df[col].fillna(df[col].median(), inplace=True)
 
+# -------------------------
+# Velocity Features
+# -------------------------
+# Backfilled in incident-date order with the same engine the app uses live;
+# the final counter state seeds the app so live features continue from history.
+USE_VELOCITY_FEATURES = True
+
+if USE_VELOCITY_FEATURES:
+    velocity = VelocityStore(VELOCITY_STATE)
+    df = df.join(velocity.backfill(df))
+    velocity.save()
+
 # -------------------------
 # Encode Categorical Columns
 # -------------------------
@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import datetime
 import os
 
+from risk import tier_style, SIU_REFERRAL_LABELS
+
 class PDF(FPDF):
     def header(self):
         # Company Letterhead
@@ -29,13 +31,18 @@ class PDF(FPDF):
         self.cell(0, 5, 'This report is confidential and intended for authorized personnel only.', 0, 1, 'C')
         self.cell(0, 5, f'Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} | Page {self.page_no()}', 0, 0, 'C')
 
-def generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers):
+def generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers, report_id=None):
+    # Background jobs pass a unique report_id so concurrent reports never share a filename
+    filename = f"reports/fraud_assessment_{report_id or datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    if report_id is None:
+        report_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    
     pdf = PDF()
     pdf.add_page()
     
     # Report Metadata
     pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 8, f"Report ID: FR-{datetime.now().strftime('%Y%m%d%H%M%S')}", ln=True)
+    pdf.cell(0, 8, f"Report ID: FR-{report_id}", ln=True)
     pdf.cell(0, 8, f"Assessment Date: {datetime.now().strftime('%B %d, %Y')}", ln=True)
     pdf.cell(0, 8, f"Analyst: AI Fraud Detection System v2.1", ln=True)
     pdf.ln(10)
@@ -47,8 +54,9 @@ def generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers):
     pdf.set_text_color(0, 0, 0)
     pdf.set_font("Arial", '', 10)
     
-    risk_color = (255, 0, 0) if risk_level == "HIGH RISK" else (255, 165, 0) if risk_level == "MODERATE RISK" else (255, 255, 0) if risk_level == "LOW-MODERATE RISK" else (0, 128, 0)
-    risk_description = "High" if risk_level == "HIGH RISK" else "Medium" if risk_level == "MODERATE RISK" else "Low-Medium" if risk_level == "LOW-MODERATE RISK" else "Low"
+    # Color and description come from the same tier config the app uses
+    color, risk_description = tier_style(risk_level)
+    risk_color = tuple(int(color.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4))
     
     pdf.set_text_color(*risk_color)
     pdf.cell(0, 8, f"Fraud Risk Level: {risk_description}", ln=True)
@@ -56,7 +64,7 @@ def generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers):
     pdf.set_text_color(0, 0, 0)
     
     summary_text = f"This automated assessment indicates a {risk_level.lower()} level of fraud suspicion for the submitted claim. "
-    if risk_level == "HIGH RISK":
+    if risk_level in SIU_REFERRAL_LABELS:
         summary_text += "Immediate investigation is recommended."
     elif risk_level == "MODERATE RISK":
         summary_text += "Enhanced review procedures should be applied."
@@ -158,7 +166,7 @@ def generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers):
     pdf.set_font("Arial", '', 10)
     
     recommendations = []
-    if risk_level == "HIGH RISK":
+    if risk_level in SIU_REFERRAL_LABELS:
         recommendations = [
             "Immediate escalation to Special Investigations Unit (SIU)",
             "Request independent verification of incident location and timing",
@@ -192,9 +200,6 @@ def generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers):
     pdf.multi_cell(0, 5, "DISCLAIMER: This assessment is generated by automated systems and should be used as a guide for human review. Final decisions regarding claim validity remain the responsibility of qualified claims adjusters and management. This report does not constitute legal advice.")
     
     # Save
-    if not os.path.exists("reports"):
-        os.makedirs("reports")
-        
-    filename = f"reports/fraud_assessment_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    os.makedirs("reports", exist_ok=True)
     pdf.output(filename)
     return filename
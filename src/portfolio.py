@@ -0,0 +1,168 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+# --- Portfolio Store ---
+# Batch-scored claims live in SQLite so the dashboard can page, filter and sort
+# in SQL. Charts read small rollup tables (one row per incident type x state x
+# risk level) that are rebuilt after each ingest instead of scanning all claims.
+PORTFOLIO_DB = "data/portfolio.db"
+
+CLAIM_COLUMNS = (
+    'claim_id', 'incident_type', 'incident_state', 'incident_city', 'incident_date',
+    'total_claim_amount', 'probability', 'risk_label', 'num_drivers', 'drivers'
+)
+FILTER_COLUMNS = ('risk_label', 'incident_type', 'incident_state')
+SORT_COLUMNS = ('probability', 'total_claim_amount', 'incident_date', 'claim_id')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scored_claims (
+    claim_id TEXT PRIMARY KEY,
+    incident_type TEXT,
+    incident_state TEXT,
+    incident_city TEXT,
+    incident_date TEXT,
+    total_claim_amount REAL,
+    probability REAL,
+    risk_label TEXT,
+    num_drivers INTEGER,
+    drivers TEXT
+);
+CREATE TABLE IF NOT EXISTS claim_drivers (
+    claim_id TEXT,
+    driver TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_claims_risk ON scored_claims (risk_label, probability);
+CREATE INDEX IF NOT EXISTS ix_claims_type ON scored_claims (incident_type, probability);
+CREATE INDEX IF NOT EXISTS ix_claims_state ON scored_claims (incident_state, probability);
+CREATE INDEX IF NOT EXISTS ix_claims_probability ON scored_claims (probability);
+CREATE INDEX IF NOT EXISTS ix_claims_amount ON scored_claims (total_claim_amount);
+CREATE INDEX IF NOT EXISTS ix_claims_date ON scored_claims (incident_date);
+CREATE INDEX IF NOT EXISTS ix_drivers_claim ON claim_drivers (claim_id);
+"""
+
+ROLLUPS = """
+DROP TABLE IF EXISTS claim_rollup;
+CREATE TABLE claim_rollup AS
+    SELECT risk_label, incident_type, incident_state,
+           COUNT(*) AS n, SUM(probability) AS sum_probability, SUM(total_claim_amount) AS sum_amount
+    FROM scored_claims
+    GROUP BY risk_label, incident_type, incident_state;
+DROP TABLE IF EXISTS driver_rollup;
+CREATE TABLE driver_rollup AS
+    SELECT c.risk_label, c.incident_type, c.incident_state, d.driver, COUNT(*) AS n
+    FROM claim_drivers d JOIN scored_claims c ON c.claim_id = d.claim_id
+    GROUP BY c.risk_label, c.incident_type, c.incident_state, d.driver;
+"""
+
+
+def _where(filters):
+    """SQL WHERE clause and params for {column: [values]} filters on FILTER_COLUMNS"""
+    clauses, params = [], []
+    for column, values in (filters or {}).items():
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unsupported filter column: {column}")
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class PortfolioStore:
+    """SQLite-backed store of batch-scored claims with paginated queries and rollups"""
+
+    def __init__(self, path=PORTFOLIO_DB):
+        self.path = path
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def version(self):
+        """Changes whenever the store is written; used as a cache key for aggregates"""
+        return os.path.getmtime(self.path) if self.exists() else 0.0
+
+    # --- Writes ---
+    def create(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def append(self, scored):
+        """Insert a chunk of scored claims (DataFrame with CLAIM_COLUMNS, drivers '|'-joined)"""
+        rows = scored[list(CLAIM_COLUMNS)].itertuples(index=False, name=None)
+        driver_rows = [
+            (claim_id, driver)
+            for claim_id, drivers in zip(scored['claim_id'], scored['drivers'])
+            for driver in drivers.split('|') if driver
+        ]
+        with self._connect() as conn, conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO scored_claims VALUES ({', '.join('?' * len(CLAIM_COLUMNS))})", rows
+            )
+            # Re-scored claims replace their driver rows instead of adding to them
+            conn.executemany("DELETE FROM claim_drivers WHERE claim_id = ?", ((c,) for c in scored['claim_id']))
+            conn.executemany("INSERT INTO claim_drivers VALUES (?, ?)", driver_rows)
+
+    def refresh_rollups(self):
+        with self._connect() as conn:
+            conn.executescript(ROLLUPS)
+
+    # --- Reads ---
+    def count(self, filters=None):
+        where, params = _where(filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COALESCE(SUM(n), 0) FROM claim_rollup{where}", params).fetchone()[0]
+
+    def load_page(self, filters=None, sort_by='probability', ascending=False, page=0, page_size=50):
+        """One page of claims, with filtering, sorting and paging done in SQL"""
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort_by}")
+        where, params = _where(filters)
+        order = "ASC" if ascending else "DESC"
+        query = (
+            f"SELECT {', '.join(CLAIM_COLUMNS)} FROM scored_claims{where} "
+            f"ORDER BY {sort_by} {order}, rowid {order} LIMIT ? OFFSET ?"
+        )
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params + [page_size, page * page_size])
+
+    def filter_options(self):
+        """Distinct values of each filter column, read from the rollup"""
+        with self._connect() as conn:
+            return {
+                column: [r[0] for r in conn.execute(f"SELECT DISTINCT {column} FROM claim_rollup ORDER BY 1")]
+                for column in FILTER_COLUMNS
+            }
+
+    def summary(self, filters=None):
+        where, params = _where(filters)
+        with self._connect() as conn:
+            n, sum_prob, sum_amount = conn.execute(
+                f"SELECT COALESCE(SUM(n), 0), SUM(sum_probability), SUM(sum_amount) FROM claim_rollup{where}", params
+            ).fetchone()
+        return {
+            'claims': n,
+            'mean_probability': (sum_prob or 0.0) / n if n else 0.0,
+            'total_amount': sum_amount or 0.0,
+        }
+
+    def breakdown(self, by, filters=None):
+        """Claim counts per value of `by` (a filter column) and risk level"""
+        if by not in FILTER_COLUMNS:
+            raise ValueError(f"Unsupported breakdown column: {by}")
+        where, params = _where(filters)
+        group = by if by == 'risk_label' else f"{by}, risk_label"
+        query = f"SELECT {group}, SUM(n) AS n FROM claim_rollup{where} GROUP BY {group}"
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def top_drivers(self, filters=None, limit=10):
+        where, params = _where(filters)
+        query = f"SELECT driver, SUM(n) AS n FROM driver_rollup{where} GROUP BY driver ORDER BY n DESC LIMIT ?"
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params + [limit])
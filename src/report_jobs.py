@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from pdf_gen import generate_pdf_report
+
+# --- Report Job Queue ---
+REPORT_WORKERS = 2
+MAX_TRACKED_JOBS = 1000   # finished jobs kept for status lookups before the oldest are dropped
+LATENCY_WINDOW = 200      # recent jobs used for latency percentiles
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class ReportJob:
+    __slots__ = ('job_id', 'status', 'submitted_at', 'started_at', 'finished_at', 'path', 'error')
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = QUEUED
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.path = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+
+class ReportJobQueue:
+    """Shared worker pool that renders PDF reports off the Streamlit script run.
+
+    Sessions submit a report and get a job ID back immediately, then poll
+    get(job_id) until the job is done and its file path is available.
+    """
+
+    def __init__(self, workers=REPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-report")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._wait_times = deque(maxlen=LATENCY_WINDOW)
+        self._run_times = deque(maxlen=LATENCY_WINDOW)
+
+    def submit(self, claim_data, prediction_prob, risk_level, key_drivers):
+        job_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        job = ReportJob(job_id)
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.finished:
+                    break
+                del self._jobs[oldest_id]
+        self._executor.submit(self._run, job, claim_data, prediction_prob, risk_level, list(key_drivers))
+        return job_id
+
+    def _run(self, job, claim_data, prediction_prob, risk_level, key_drivers):
+        job.started_at = time.monotonic()
+        job.status = RUNNING
+        try:
+            job.path = generate_pdf_report(claim_data, prediction_prob, risk_level, key_drivers, report_id=job.job_id)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        job.finished_at = time.monotonic()
+        with self._lock:
+            self._wait_times.append(job.started_at - job.submitted_at)
+            self._run_times.append(job.finished_at - job.started_at)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        """1-based place in the queue for a queued job, else 0"""
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j.status == QUEUED]
+        for i, job in enumerate(queued, 1):
+            if job.job_id == job_id:
+                return i
+        return 0
+
+    def stats(self):
+        """Queue depth and job latency (seconds) over the last LATENCY_WINDOW jobs"""
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+            wait = np.array(self._wait_times)
+            run = np.array(self._run_times)
+        total = wait + run
+        return {
+            'queued': statuses.count(QUEUED),
+            'running': statuses.count(RUNNING),
+            'completed': len(run),
+            'wait_p50': float(np.percentile(wait, 50)) if len(wait) else 0.0,
+            'latency_p50': float(np.percentile(total, 50)) if len(total) else 0.0,
+            'latency_p95': float(np.percentile(total, 95)) if len(total) else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
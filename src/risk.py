@@ -0,0 +1,138 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from velocity import VELOCITY_COLUMNS, burst_keys, burst_flags
+
+# --- Heuristic Risk Drivers ---
+RECENT_POLICY = "Recent Policy (Bind < 30 days)"
+NO_POLICE_REPORT = "High Value Claim without Police Report"
+NO_WITNESSES = "Major Incident with No Witnesses"
+SINGLE_VEHICLE = "Single Vehicle Incident Category"
+
+# Velocity bursts (see velocity.BURST_KEYS)
+BURST_DRIVERS = {
+    'city': "Claim Burst in Incident City",
+    'vehicle': "Claim Burst on Same Vehicle Make/Model",
+    'bind_week': "Claim Cluster on Policies Bound Same Week",
+}
+
+RISK_DRIVERS = (RECENT_POLICY, NO_POLICE_REPORT, NO_WITNESSES, SINGLE_VEHICLE) + tuple(BURST_DRIVERS.values())
+
+# --- Risk Tiers (highest first): (label, description, color, min probability, min drivers) ---
+# A claim lands in the first tier whose probability OR driver-count cutoff it
+# meets. The cutoffs can be tuned against investigator capacity with
+# tier_optimizer.py, which writes RISK_TIER_CONFIG; the app and the PDF
+# generator read it at startup and fall back to these defaults without it.
+RISK_TIER_CONFIG = os.environ.get("FRAUD_RISK_TIERS", "models/risk_tiers.json")
+
+DEFAULT_RISK_TIERS = (
+    ("HIGH RISK", "High", "#FF0000", 0.7, 3),
+    ("MODERATE RISK", "Medium", "#FFA500", 0.3, 2),
+    ("LOW-MODERATE RISK", "Low-Medium", "#FFD700", 0.1, 1),
+)
+DEFAULT_LOW_TIER = ("LOW RISK", "Low", "#008000")
+DEFAULT_SIU_LABELS = ("HIGH RISK",)  # tiers referred to the Special Investigations Unit
+
+
+def load_risk_tiers(path=RISK_TIER_CONFIG):
+    """(tiers, default tier, SIU referral labels) from a tier config file, or the defaults"""
+    if not os.path.exists(path):
+        return DEFAULT_RISK_TIERS, DEFAULT_LOW_TIER, DEFAULT_SIU_LABELS
+    try:
+        with open(path) as f:
+            config = json.load(f)
+        tiers = tuple(
+            (t['label'], t['description'], t['color'], float(t['min_probability']), int(t['min_drivers']))
+            for t in config['tiers']
+        )
+        default = config['default']
+        for color in [t[2] for t in tiers] + [default['color']]:
+            # The PDF generator needs an RGB value, so colors are hex strings rather than CSS names
+            if not (isinstance(color, str) and len(color) == 7 and color[0] == '#'):
+                raise ValueError(f"color {color!r} is not #RRGGBB")
+            int(color[1:], 16)
+        siu_labels = tuple(t['label'] for t in config['tiers'] if t.get('siu_referral'))
+        return tiers, (default['label'], default['description'], default['color']), siu_labels
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        warnings.warn(f"Invalid risk tier config {path} ({e}); using default tiers")
+        return DEFAULT_RISK_TIERS, DEFAULT_LOW_TIER, DEFAULT_SIU_LABELS
+
+
+def save_risk_tiers(path, tiers, default, siu_labels, metrics=None):
+    """Write a tier config in the format load_risk_tiers reads (metrics are informational)"""
+    config = {
+        'tiers': [
+            {'label': label, 'description': description, 'color': color, 'min_probability': min_prob,
+             'min_drivers': min_drivers, 'siu_referral': label in siu_labels}
+            for label, description, color, min_prob, min_drivers in tiers
+        ],
+        'default': {'label': default[0], 'description': default[1], 'color': default[2]},
+    }
+    if metrics is not None:
+        config['metrics'] = metrics
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+RISK_TIERS, DEFAULT_TIER, SIU_REFERRAL_LABELS = load_risk_tiers()
+RISK_LABELS = tuple(t[0] for t in RISK_TIERS) + (DEFAULT_TIER[0],)
+
+
+def tier_style(label):
+    """(color, description) for a risk label"""
+    for tier_label, description, color, _, _ in RISK_TIERS:
+        if tier_label == label:
+            return color, description
+    return DEFAULT_TIER[2], DEFAULT_TIER[1]
+
+def get_risk_drivers(claim):
+    """Heuristic red flags for a single ClaimRecord"""
+    drivers = []
+    if claim.days_since_policy_bind < 30:
+        drivers.append(RECENT_POLICY)
+    if claim.police_report_available == "NO" and claim.total_claim_amount > 20000:
+        drivers.append(NO_POLICE_REPORT)
+    if claim.incident_severity == "Major Damage" and claim.witnesses == 0:
+        drivers.append(NO_WITNESSES)
+    if claim.incident_type == "Single Vehicle Collision":
+        drivers.append(SINGLE_VEHICLE)
+    if claim.velocity:
+        drivers.extend(BURST_DRIVERS[key] for key in burst_keys(claim.velocity))
+    return drivers
+
+
+def get_risk_driver_flags(df):
+    """Vectorized get_risk_drivers: one boolean column per driver for a frame of raw claims"""
+    flags = pd.DataFrame({
+        RECENT_POLICY: df['days_since_policy_bind'] < 30,
+        NO_POLICE_REPORT: (df['police_report_available'] == "NO") & (df['total_claim_amount'] > 20000),
+        NO_WITNESSES: (df['incident_severity'] == "Major Damage") & (df['witnesses'] == 0),
+        SINGLE_VEHICLE: df['incident_type'] == "Single Vehicle Collision",
+    }, index=df.index)
+    if all(c in df.columns for c in VELOCITY_COLUMNS):
+        flags = flags.join(burst_flags(df).rename(columns=BURST_DRIVERS))
+    return flags
+
+
+def assess_risk(probability, num_drivers):
+    """Combine model probability and driver count into (color, label, description)"""
+    for label, description, color, min_prob, min_drivers in RISK_TIERS:
+        if probability > min_prob or num_drivers >= min_drivers:
+            return color, label, description
+    label, description, color = DEFAULT_TIER
+    return color, label, description
+
+
+def assess_risk_batch(probabilities, num_drivers, tiers=None, default_label=None):
+    """Vectorized assess_risk returning an array of risk labels (optionally for other tiers)"""
+    tiers = RISK_TIERS if tiers is None else tiers
+    default_label = DEFAULT_TIER[0] if default_label is None else default_label
+    probabilities = np.asarray(probabilities)
+    num_drivers = np.asarray(num_drivers)
+    conditions = [(probabilities > t[3]) | (num_drivers >= t[4]) for t in tiers]
+    return np.select(conditions, [t[0] for t in tiers], default=default_label)
@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from claim_state import MODEL_COLUMNS
+from tree_engine import CompiledTrees
+from velocity import VELOCITY_COLUMNS
+
+# --- Serving Defaults ---
+# One inference thread per call, and no more concurrent calls than cores, keeps
+# many Streamlit sessions from oversubscribing the CPU on a shared model.
+CPU_COUNT = os.cpu_count() or 1
+INFERENCE_THREADS = int(os.environ.get("FRAUD_INFERENCE_THREADS", 1))
+BATCHED_INFERENCE = os.environ.get("FRAUD_BATCHED_INFERENCE", "0") == "1"
+
+
+def model_features(model):
+    """Feature names a fitted model expects, in order (None if it doesn't record them)"""
+    names = getattr(model, "feature_names_in_", None)
+    if names is None and hasattr(model, "get_booster"):
+        names = model.get_booster().feature_names
+    return None if names is None else list(names)
+
+
+def uses_velocity(model):
+    """True if a fitted model (or ModelServer) was trained with the velocity features"""
+    names = model.features if isinstance(model, ModelServer) else model_features(model)
+    return bool(names) and any(c in VELOCITY_COLUMNS for c in names)
+
+
+def load_model_artifact(path, prefer_compiled=True):
+    """Load a pickled model, preferring its tree_engine export (<name>.npz) when one exists.
+
+    The export only wins on single-claim latency; batch callers pass
+    prefer_compiled=False to get the pickle (the export is still used if it is the only file).
+    """
+    compiled_path = os.path.splitext(path)[0] + ".npz"
+    if os.path.exists(compiled_path) and (prefer_compiled or not os.path.exists(path)):
+        return CompiledTrees.load(compiled_path)
+    return joblib.load(path)
+
+
+def limit_model_threads(model, threads):
+    """Pin the per-call thread count of a fitted model (XGBoost nthread / sklearn n_jobs)"""
+    # XGBModel.set_params also forwards nthread to the fitted booster
+    if hasattr(model, "get_params") and "n_jobs" in model.get_params():
+        model.set_params(n_jobs=threads)
+    return model
+
+
+class ModelServer:
+    """Shared, thread-safe wrapper around one fitted model.
+
+    Concurrent callers are admitted through a semaphore sized so that
+    in-flight calls x threads per call stays within the core count. With
+    batching enabled, single-claim requests are queued to one worker thread
+    that scores them together in a single predict_proba call.
+    """
+
+    def __init__(self, model, threads_per_call=INFERENCE_THREADS, max_concurrency=None,
+                 batching=BATCHED_INFERENCE, max_batch=64, max_wait_ms=2.0):
+        self.model = limit_model_threads(model, threads_per_call)
+        self.features = model_features(model) or list(MODEL_COLUMNS)
+        self.threads_per_call = threads_per_call
+        if max_concurrency is None:
+            max_concurrency = max(1, CPU_COUNT // threads_per_call)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.batching = batching
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._worker = None
+        self._submit_lock = threading.Lock()  # orders enqueues before close()'s shutdown marker
+        if batching:
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._batch_loop, name="model-batcher", daemon=True)
+            self._worker.start()
+
+    def _as_frame(self, X):
+        """Frame with exactly the model's feature columns (extra columns such as unused velocity features are dropped)"""
+        if isinstance(X, pd.DataFrame):
+            return X if list(X.columns) == self.features else X[self.features]
+        return pd.DataFrame(np.atleast_2d(X), columns=self.features)
+
+    def predict_proba(self, X):
+        """Score a frame or matrix directly on the calling thread"""
+        X = self._as_frame(X)
+        if len(X) == 1:
+            future = self._submit(X.to_numpy(dtype=np.float64)[0])
+            if future is not None:
+                return future.result()
+        with self._slots:
+            return self.model.predict_proba(X)
+
+    def _submit(self, vector):
+        """Queue one vector for the batching worker, or return None once it is stopped"""
+        with self._submit_lock:
+            if self._worker is None:
+                return None
+            future = Future()
+            self._queue.put((vector, future))
+        return future
+
+    # --- Batching Worker ---
+    def _batch_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Re-queue the shutdown marker and flush what we have
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            vectors = np.vstack([v for v, _ in batch])
+            try:
+                with self._slots:
+                    probs = self.model.predict_proba(self._as_frame(vectors))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for i, (_, future) in enumerate(batch):
+                future.set_result(probs[i:i + 1])
+
+    def close(self):
+        """Stop the batching worker; later calls are scored directly on the calling thread"""
+        with self._submit_lock:
+            worker, self._worker = self._worker, None
+            if worker is not None:
+                # Every queued request is ahead of the marker, so the worker answers it before exiting
+                self._queue.put(None)
+        if worker is not None:
+            worker.join()
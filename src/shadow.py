@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from claim_state import MODEL_COLUMNS
+from risk import RISK_LABELS, assess_risk_batch
+from velocity import VELOCITY_COLUMNS
+
+# --- Shadow Scoring ---
+# A candidate model scores the same model input as production on a background
+# worker. The production answer is never delayed or changed; both outputs are
+# logged and compared so a model swap can be judged before the cut-over.
+SHADOW_DB = "data/shadow.db"
+SHADOW_MODEL = os.environ.get("FRAUD_SHADOW_MODEL")  # candidate file in models/, unset disables shadow mode
+MAX_PENDING = 256      # queued shadow scores before new ones are dropped (never back-pressures requests)
+LATENCY_WINDOW = 1000  # recent calls used for latency percentiles
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_log (
+    logged_at TEXT,
+    production_model TEXT,
+    candidate_model TEXT,
+    production_probability REAL,
+    candidate_probability REAL,
+    production_label TEXT,
+    candidate_label TEXT,
+    num_drivers INTEGER,
+    production_ms REAL,
+    candidate_ms REAL,
+    features BLOB
+);
+"""
+# Logged model inputs are ClaimRecord.model_frame() vectors: MODEL_COLUMNS, then VELOCITY_COLUMNS when set
+LOGGED_FEATURES = tuple(MODEL_COLUMNS) + tuple(VELOCITY_COLUMNS)
+LOG_COLUMNS = (
+    'logged_at', 'production_model', 'candidate_model', 'production_probability', 'candidate_probability',
+    'production_label', 'candidate_label', 'num_drivers', 'production_ms', 'candidate_ms', 'features'
+)
+
+
+class ShadowStats:
+    """Running agreement between production and candidate scores.
+
+    update() takes aligned arrays, so live single claims and replay batches
+    share the same aggregation.
+    """
+
+    def __init__(self):
+        self.compared = 0
+        self.label_agreements = 0
+        self.abs_diff_sum = 0.0
+        self.max_abs_diff = 0.0
+        # flips[i, j]: production said RISK_LABELS[i], candidate said RISK_LABELS[j]
+        self.flips = np.zeros((len(RISK_LABELS), len(RISK_LABELS)), dtype=np.int64)
+        self.latency_ms = {'production': deque(maxlen=LATENCY_WINDOW), 'candidate': deque(maxlen=LATENCY_WINDOW)}
+
+    def update(self, production_probs, candidate_probs, production_labels, candidate_labels,
+               production_ms=None, candidate_ms=None):
+        diff = np.abs(np.asarray(candidate_probs, dtype=np.float64) - np.asarray(production_probs, dtype=np.float64))
+        index = {label: i for i, label in enumerate(RISK_LABELS)}
+        prod = np.array([index[label] for label in production_labels])
+        cand = np.array([index[label] for label in candidate_labels])
+
+        self.compared += len(diff)
+        self.label_agreements += int((prod == cand).sum())
+        self.abs_diff_sum += float(diff.sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(diff.max(initial=0.0)))
+        np.add.at(self.flips, (prod, cand), 1)
+        if production_ms is not None:
+            self.latency_ms['production'].append(production_ms)
+        if candidate_ms is not None:
+            self.latency_ms['candidate'].append(candidate_ms)
+
+    def summary(self):
+        n = self.compared
+        flips = {
+            f"{RISK_LABELS[i]} -> {RISK_LABELS[j]}": int(self.flips[i, j])
+            for i, j in zip(*np.nonzero(self.flips)) if i != j
+        }
+        out = {
+            'compared': n,
+            'label_agreement': self.label_agreements / n if n else 0.0,
+            'flip_rate': 1.0 - self.label_agreements / n if n else 0.0,
+            'mean_abs_diff': self.abs_diff_sum / n if n else 0.0,
+            'max_abs_diff': self.max_abs_diff,
+            'flips': flips,
+        }
+        for model, times in self.latency_ms.items():
+            times = np.array(times)
+            out[f"{model}_ms_p50"] = float(np.percentile(times, 50)) if len(times) else 0.0
+            out[f"{model}_ms_p95"] = float(np.percentile(times, 95)) if len(times) else 0.0
+        return out
+
+
+class ShadowLog:
+    """SQLite log of paired production / candidate scores (model input kept as a float32 blob for replay)"""
+
+    def __init__(self, path=SHADOW_DB):
+        self.path = path
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def create(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def append(self, rows):
+        with self._connect() as conn, conn:
+            conn.executemany(f"INSERT INTO shadow_log VALUES ({', '.join('?' * len(LOG_COLUMNS))})", rows)
+
+    def iter_batches(self, batch_size, production_model=None):
+        """Yield (production probabilities, num_drivers, model input frame) for logged assessments"""
+        query = "SELECT production_probability, num_drivers, features FROM shadow_log"
+        params = []
+        if production_model:
+            query += " WHERE production_model = ?"
+            params.append(production_model)
+        with self._connect() as conn:
+            cursor = conn.execute(query + " ORDER BY rowid", params)
+            while rows := cursor.fetchmany(batch_size):
+                probs, drivers, blobs = zip(*rows)
+                probs, drivers = np.array(probs), np.array(drivers)
+                vectors = [np.frombuffer(b, dtype=np.float32) for b in blobs]
+                # Claims logged with and without velocity features have different widths
+                widths = np.array([len(v) for v in vectors])
+                for width in np.unique(widths):
+                    idx = np.flatnonzero(widths == width)
+                    X = pd.DataFrame(np.vstack([vectors[i] for i in idx]), columns=list(LOGGED_FEATURES[:width]))
+                    yield probs[idx], drivers[idx], X
+
+
+class ShadowScorer:
+    """Scores a candidate model beside production on a background worker.
+
+    submit() returns immediately; the candidate call, the comparison and the
+    log write all happen on the worker. When the backlog reaches
+    MAX_PENDING, new claims are counted as dropped instead of queued.
+    """
+
+    def __init__(self, production_name, candidate, candidate_name, log=None, workers=1):
+        self.production_name = production_name
+        self.candidate = candidate  # a ModelServer, so shadow calls share its thread limits
+        self.candidate_name = candidate_name
+        self.log = log or ShadowLog()
+        self.log.create()
+        self._stats = ShadowStats()
+        self.pending = 0
+        self.dropped = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shadow")
+
+    def submit(self, X, production_prob, production_ms, num_drivers):
+        with self._lock:
+            if self.pending >= MAX_PENDING:
+                self.dropped += 1
+                return False
+            self.pending += 1
+        self._executor.submit(self._run, X, float(production_prob), production_ms, int(num_drivers))
+        return True
+
+    def _run(self, X, production_prob, production_ms, num_drivers):
+        try:
+            t0 = time.perf_counter()
+            candidate_prob = float(self.candidate.predict_proba(X)[0, 1])
+            candidate_ms = (time.perf_counter() - t0) * 1000
+            labels = assess_risk_batch([production_prob, candidate_prob], [num_drivers, num_drivers])
+            with self._lock:
+                self._stats.update([production_prob], [candidate_prob], labels[:1], labels[1:],
+                                   production_ms, candidate_ms)
+            self.log.append([(
+                datetime.now().isoformat(timespec='seconds'), self.production_name, self.candidate_name,
+                production_prob, candidate_prob, str(labels[0]), str(labels[1]), num_drivers,
+                production_ms, candidate_ms, X.to_numpy(dtype=np.float32)[0].tobytes(),
+            )])
+        except Exception:
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self):
+        with self._lock:
+            out = self._stats.summary()
+            out.update(pending=self.pending, dropped=self.dropped, failed=self.failed)
+        return out
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,143 @@
+# shadow_replay.py
+#
+# Re-scores stored historical assessments with a candidate model and reports
+# how it would have disagreed with production: label agreement, risk-label
+# flips and probability drift, aggregated as in live shadow mode.
+#   --source portfolio  claims batch-scored into the portfolio store, re-read
+#                       from the raw input file they were scored from
+#   --source log        assessments recorded by live shadow mode (data/shadow.db)
+# Batches are scored in parallel on a thread pool (tree libraries release the
+# GIL while scoring), with at most 2 x workers batches in memory.
+#
+# Usage: python src/shadow_replay.py --candidate xgboost_budget.pkl --input claims.csv [--db data/portfolio.db]
+#        python src/shadow_replay.py --candidate xgboost_budget.pkl --source log [--log data/shadow.db]
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import joblib
+import pandas as pd
+
+from portfolio import PortfolioStore, PORTFOLIO_DB
+from risk import assess_risk_batch
+from score_batch import read_claims, score_chunk, source_name
+from serving import ModelServer, CPU_COUNT, load_model_artifact, uses_velocity
+from shadow import ShadowLog, ShadowStats, SHADOW_DB
+from velocity import VelocityStore, VELOCITY_WINDOWS
+
+MODEL_DIR = "models/"
+
+
+def stored_assessments(db_path, claim_ids):
+    """Stored production probability, risk label and driver count per claim ID, aligned to claim_ids (NaN if missing)"""
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("CREATE TEMP TABLE replay_ids (pos INTEGER, claim_id TEXT)")
+        conn.executemany("INSERT INTO replay_ids VALUES (?, ?)", enumerate(claim_ids))
+        stored = pd.read_sql_query(
+            "SELECT r.pos, c.probability, c.risk_label, c.num_drivers FROM replay_ids r "
+            "JOIN scored_claims c ON c.claim_id = r.claim_id", conn
+        )
+    return stored.set_index('pos').reindex(range(len(claim_ids)))
+
+
+def replay_portfolio(args, candidate, encoders):
+    """Yield (production probs, candidate probs, production labels, candidate labels) per input chunk"""
+    def score(chunk, offset):
+        rescored = score_chunk(chunk, candidate, encoders, offset=offset, source=source)
+        stored = stored_assessments(args.db, rescored['claim_id'].tolist())
+        found = stored['probability'].notna().to_numpy()
+        stored, candidate_probs = stored[found], rescored['probability'].to_numpy()[found]
+        # Label with the stored driver count so only the model differs (the store may include velocity drivers)
+        return (stored['probability'].to_numpy(), candidate_probs, stored['risk_label'].to_numpy(),
+                assess_risk_batch(candidate_probs, stored['num_drivers'].to_numpy()))
+
+    source = args.source_name or source_name(args.input)
+    chunks = read_claims(args.input, args.batch_size)
+    if uses_velocity(candidate):
+        # Backfilled in file order on this thread, so the counters span chunks as in score_batch.py
+        velocity = VelocityStore(retention_days=max(VELOCITY_WINDOWS))
+        chunks = (chunk.join(velocity.backfill(chunk)) for chunk in chunks)
+    yield from _parallel(score, ((chunk, i * args.batch_size) for i, chunk in enumerate(chunks)), args.workers)
+
+
+def replay_log(args, candidate):
+    def score(production_probs, num_drivers, X):
+        candidate_probs = candidate.predict_proba(X)[:, 1]
+        return (production_probs, candidate_probs,
+                assess_risk_batch(production_probs, num_drivers), assess_risk_batch(candidate_probs, num_drivers))
+
+    batches = ShadowLog(args.log).iter_batches(args.batch_size)
+    yield from _parallel(score, batches, args.workers)
+
+
+def _parallel(fn, items, workers):
+    """Ordered map of fn over items on a thread pool, keeping at most 2 x workers batches in flight"""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay") as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, *item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay stored assessments through a candidate model")
+    parser.add_argument("--candidate", required=True, help="Candidate model file in models/")
+    parser.add_argument("--source", choices=("portfolio", "log"), default="portfolio")
+    parser.add_argument("--input", help="Raw claims file the portfolio store was scored from (--source portfolio)")
+    parser.add_argument("--db", default=PORTFOLIO_DB)
+    parser.add_argument("--source-name", help="Claim ID namespace used by score_batch.py --source (default: the input file name)")
+    parser.add_argument("--log", default=SHADOW_DB)
+    # Same as score_batch.py --chunksize, so velocity backfills see the same chunks
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=CPU_COUNT)
+    parser.add_argument("--output", help="Write the summary as JSON")
+    args = parser.parse_args()
+
+    # One thread per call: parallelism comes from scoring several batches at once. The pickle
+    # scores large batches several times faster than the compiled export.
+    candidate = ModelServer(load_model_artifact(os.path.join(MODEL_DIR, args.candidate), prefer_compiled=False),
+                            threads_per_call=1, max_concurrency=args.workers, batching=False)
+
+    if args.source == "portfolio":
+        if not args.input:
+            parser.error("--source portfolio needs --input")
+        if not PortfolioStore(args.db).exists():
+            parser.error(f"Portfolio store not found: {args.db}")
+        encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+        results = replay_portfolio(args, candidate, encoders)
+    else:
+        if not ShadowLog(args.log).exists():
+            parser.error(f"Shadow log not found: {args.log}")
+        results = replay_log(args, candidate)
+
+    stats = ShadowStats()
+    t0 = time.perf_counter()
+    for production_probs, candidate_probs, production_labels, candidate_labels in results:
+        stats.update(production_probs, candidate_probs, production_labels, candidate_labels)
+        print(f"Replayed {stats.compared:,} assessments ({time.perf_counter() - t0:.1f}s)")
+    elapsed = time.perf_counter() - t0
+
+    # Stored assessments carry no production latency; batch throughput replaces the per-call percentiles
+    summary = {k: v for k, v in stats.summary().items() if '_ms_' not in k}
+    summary['claims_per_second'] = stats.compared / elapsed if elapsed else 0.0
+
+    print(f"\nCandidate {args.candidate} vs stored production assessments ({args.source})")
+    print(f"  compared:        {summary['compared']:,}")
+    print(f"  label agreement: {summary['label_agreement']:.2%}  (flip rate {summary['flip_rate']:.2%})")
+    print(f"  probability |d|: mean {summary['mean_abs_diff']:.4f}, max {summary['max_abs_diff']:.4f}")
+    print(f"  throughput:      {summary['claims_per_second']:,.0f} claims/s on {args.workers} workers")
+    for flip, n in sorted(summary['flips'].items(), key=lambda f: -f[1]):
+        print(f"  {flip}: {n:,}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
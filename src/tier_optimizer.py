@@ -0,0 +1,205 @@
+# tier_optimizer.py
+#
+# Tunes the risk-tier cutoffs against investigator capacity. Labelled claims
+# are scored once (or read pre-scored). The claims are then sorted by probability a
+# single time, and for each driver-count cutoff one cumulative-sum pass gives the
+# volume and frauds caught at every probability cutoff, without rescoring per threshold.
+# Tiers are fitted top-down: each tier takes the cutoffs that catch the most
+# fraud within its monthly capacity while staying nested inside the tier above.
+#
+# Raw claims get velocity features backfilled in file order, as score_batch.py
+# --velocity does, so driver counts include the burst drivers the app counts.
+#
+# Writes the tier config read by risk.py (the app and the PDF generator) at startup.
+#
+# Usage: python src/tier_optimizer.py --input labelled_claims.csv --capacity "HIGH RISK=400" \
+#            --capacity "MODERATE RISK=1500" [--output models/risk_tiers.json]
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from risk import (
+    RISK_TIERS, DEFAULT_TIER, SIU_REFERRAL_LABELS, RISK_TIER_CONFIG, RISK_DRIVERS,
+    assess_risk_batch, save_risk_tiers
+)
+from score_batch import read_claims, score_chunk
+from serving import uses_velocity
+from velocity import VelocityStore, VELOCITY_WINDOWS
+
+MODEL_DIR = "models/"
+DAYS_PER_MONTH = 365.25 / 12
+NO_DRIVER_RULE = len(RISK_DRIVERS) + 1  # min_drivers no claim can reach
+
+
+def load_scored(path, model, encoders, chunksize, velocity=None):
+    """(probabilities, driver counts, fraud labels, incident dates) for a labelled claims file.
+
+    Files that already carry `probability` and `num_drivers` columns are used
+    as-is; otherwise each chunk is scored once with the model, with velocity
+    features from `velocity` shared across chunks.
+    """
+    probs, drivers, labels, days = [], [], [], []
+    for chunk in read_claims(path, chunksize):
+        if 'probability' in chunk.columns and 'num_drivers' in chunk.columns:
+            scored = chunk
+        else:
+            scored = score_chunk(chunk, model, encoders, velocity=velocity)
+        probs.append(scored['probability'].to_numpy(dtype=np.float64))
+        drivers.append(scored['num_drivers'].to_numpy(dtype=np.int16))
+        fraud = chunk['fraud_reported']
+        labels.append((fraud.astype(str).isin(('Y', '1', 'True'))).to_numpy())
+        if 'incident_date' in chunk.columns:
+            days.append(pd.to_datetime(chunk['incident_date']).to_numpy(dtype='datetime64[D]'))
+        print(f"Loaded {sum(len(p) for p in probs):,} claims")
+    dates = np.concatenate(days) if days else None
+    return np.concatenate(probs), np.concatenate(drivers), np.concatenate(labels), dates
+
+
+class CutoffSweep:
+    """Claims sorted once by probability, swept with cumulative sums per driver cutoff.
+
+    Taking the top j claims is a probability cutoff of p_sorted[j] (p > cutoff),
+    valid wherever p_sorted[j - 1] > p_sorted[j]; ties stay together.
+    """
+
+    def __init__(self, probabilities, num_drivers, fraud):
+        order = np.argsort(-probabilities, kind='stable')
+        self.p = probabilities[order]
+        self.d = num_drivers[order]
+        self.y = fraud[order]
+        self.positives = int(self.y.sum())
+        valid = np.ones(len(self.p), dtype=bool)
+        valid[1:] = self.p[:-1] > self.p[1:]
+        self.top = np.flatnonzero(valid)  # claims taken by the probability rule at each cutoff
+        self.cutoffs = self.p[self.top]
+        self._cache = {}
+
+    def sweep(self, min_drivers):
+        """(cutoffs, claims, frauds) of the rule `p > cutoff or drivers >= min_drivers` at every cutoff"""
+        if min_drivers not in self._cache:
+            forced = self.d >= min_drivers
+            rest = ~forced
+            cum_claims = np.concatenate(([0], np.cumsum(rest)))
+            cum_frauds = np.concatenate(([0], np.cumsum(rest & self.y)))
+            claims = forced.sum() + cum_claims[self.top]
+            frauds = (forced & self.y).sum() + cum_frauds[self.top]
+            self._cache[min_drivers] = (claims, frauds)
+        claims, frauds = self._cache[min_drivers]
+        return self.cutoffs, claims, frauds
+
+
+def optimize(sweep, capacities):
+    """Nested tiers, top-down: most frauds within each tier's capacity (claims over the data); ties take fewer claims"""
+    tiers, max_cutoff, max_drivers, volume = [], 1.0, NO_DRIVER_RULE, 0
+    for label, description, color, min_prob, min_drivers in RISK_TIERS:
+        if label not in capacities:
+            # Unconstrained tiers keep their cutoffs, tightened to nest inside the tier above
+            cutoff, drivers = min(min_prob, max_cutoff), min(min_drivers, max_drivers)
+        else:
+            best = None  # (frauds, -claims, cutoff, drivers)
+            for drivers in range(max_drivers + 1):
+                cutoffs, claims, frauds = sweep.sweep(drivers)
+                feasible = np.flatnonzero((cutoffs <= max_cutoff) & (claims - volume <= capacities[label]))
+                if not feasible.size:
+                    continue
+                i = feasible[np.lexsort((claims[feasible], -frauds[feasible]))[0]]
+                candidate = (int(frauds[i]), -int(claims[i]), float(cutoffs[i]), drivers)
+                if best is None or candidate[:2] > best[:2]:
+                    best = candidate
+            # No feasible cutoff: the tier adds nothing beyond the tier above
+            cutoff, drivers = (best[2], best[3]) if best else (max_cutoff, max_drivers)
+        tiers.append((label, description, color, cutoff, drivers))
+        max_cutoff, max_drivers = cutoff, drivers
+        volume = int(((sweep.p > cutoff) | (sweep.d >= drivers)).sum())
+    return tuple(tiers)
+
+
+def tier_metrics(tiers, probabilities, num_drivers, fraud, months):
+    """Per-tier claims, monthly volume, precision and recall, plus SIU referral totals"""
+    labels = assess_risk_batch(probabilities, num_drivers, tiers, DEFAULT_TIER[0])
+    positives = max(int(fraud.sum()), 1)
+    out, cumulative = {}, 0
+    for label in [t[0] for t in tiers] + [DEFAULT_TIER[0]]:
+        in_tier = labels == label
+        n, caught = int(in_tier.sum()), int(fraud[in_tier].sum())
+        cumulative += caught
+        out[label] = {
+            'claims': n,
+            'per_month': n / months,
+            'precision': caught / n if n else 0.0,
+            'recall': caught / positives,
+            'cumulative_recall': cumulative / positives,
+        }
+    siu = np.isin(labels, SIU_REFERRAL_LABELS)
+    n, caught = int(siu.sum()), int(fraud[siu].sum())
+    out['SIU referrals'] = {
+        'claims': n, 'per_month': n / months,
+        'precision': caught / n if n else 0.0, 'recall': caught / positives,
+    }
+    return out
+
+
+def print_metrics(title, tiers, metrics):
+    print(f"\n{title}")
+    print(f"{'tier':<20}{'cutoff':>8}{'drivers':>9}{'claims':>11}{'/month':>9}{'precision':>11}{'recall':>8}{'cum.':>8}")
+    cutoffs = {t[0]: (f"{t[3]:.4f}", str(t[4]) if t[4] < NO_DRIVER_RULE else "-") for t in tiers}
+    for label, m in metrics.items():
+        cutoff, drivers = cutoffs.get(label, ("", ""))
+        print(f"{label:<20}{cutoff:>8}{drivers:>9}{m['claims']:>11,}{m['per_month']:>9,.0f}"
+              f"{m['precision']:>11.1%}{m['recall']:>8.1%}{m.get('cumulative_recall', m['recall']):>8.1%}")
+
+
+def parse_capacity(value):
+    label, _, per_month = value.rpartition('=')
+    if label not in [t[0] for t in RISK_TIERS]:
+        raise argparse.ArgumentTypeError(f"unknown tier {label!r} (tiers: {', '.join(t[0] for t in RISK_TIERS)})")
+    return label, float(per_month)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit risk-tier cutoffs to investigator capacity")
+    parser.add_argument("--input", required=True,
+                        help="Labelled claims (fraud_reported), raw or with probability/num_drivers columns")
+    parser.add_argument("--capacity", type=parse_capacity, action="append", default=[],
+                        help='Claims per month a tier can take, e.g. "HIGH RISK=400" (repeatable)')
+    parser.add_argument("--months", type=float, help="Months the input covers (default: incident_date span)")
+    parser.add_argument("--model", default="xgboost.pkl")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--no-velocity", action="store_true",
+                        help="Skip velocity features and burst drivers (not possible for models trained with them)")
+    parser.add_argument("--output", default=RISK_TIER_CONFIG)
+    args = parser.parse_args()
+
+    model = joblib.load(os.path.join(MODEL_DIR, args.model))
+    encoders = joblib.load(os.path.join(MODEL_DIR, "label_encoders.pkl"))
+    # Input is read in file order, so counters only need to keep one window of history
+    use_velocity = not args.no_velocity or uses_velocity(model)
+    velocity = VelocityStore(retention_days=max(VELOCITY_WINDOWS)) if use_velocity else None
+    probabilities, num_drivers, fraud, dates = load_scored(args.input, model, encoders, args.chunksize, velocity)
+
+    months = args.months
+    if months is None:
+        if dates is None:
+            parser.error("--months is required when the input has no incident_date")
+        months = max(1.0, (dates.max() - dates.min()).astype(int) / DAYS_PER_MONTH)
+    capacities = {label: per_month * months for label, per_month in args.capacity}
+
+    t0 = time.perf_counter()
+    sweep = CutoffSweep(probabilities, num_drivers, fraud)
+    tiers = optimize(sweep, capacities)
+    print(f"Swept {len(sweep.cutoffs):,} cutoffs x {len(sweep._cache)} driver rules "
+          f"over {len(probabilities):,} claims ({months:.1f} months) in {time.perf_counter() - t0:.2f}s")
+
+    print_metrics("Current tiers", RISK_TIERS, tier_metrics(RISK_TIERS, probabilities, num_drivers, fraud, months))
+    metrics = tier_metrics(tiers, probabilities, num_drivers, fraud, months)
+    print_metrics("Optimized tiers", tiers, metrics)
+
+    save_risk_tiers(args.output, tiers, DEFAULT_TIER, SIU_REFERRAL_LABELS,
+                    metrics={'claims': len(probabilities), 'months': months,
+                             'capacity_per_month': dict(args.capacity), 'tiers': metrics})
+    print(f"\nTier config written to {args.output} (loaded by the app and PDF reports at startup)")
@@ -0,0 +1,210 @@
+# tree_engine.py
+#
+# Array-backed inference for tree ensembles. A fitted RandomForestClassifier or
+# XGBClassifier is flattened into contiguous NumPy node arrays (feature,
+# threshold, children, leaf value) and scored with a vectorized traversal that
+# advances all unfinished (claim, tree) pairs one level per step.
+#
+# Usage: python src/tree_engine.py --model random_forest.pkl  (writes models/random_forest.npz)
+
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = "models/"
+BATCH_ROWS = 4096  # rows traversed at once; bounds the (rows x trees) node-index matrix
+
+
+class CompiledTrees:
+    """Flattened tree ensemble with a predict_proba compatible with the source model.
+
+    All trees share one node table, and leaves point to themselves. Traversal
+    keeps a flat (row, tree) node vector and advances only the pairs that
+    have not reached a leaf yet.
+    `link` is 'mean' for random forests (average leaf probabilities) or
+    'logistic' for XGBoost (sum leaf margins plus base_margin, then sigmoid).
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 max_depth, link, base_margin=0.0, strict=False, feature_names=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self.max_depth = int(max_depth)
+        self.link = link
+        self.base_margin = float(base_margin)
+        # sklearn sends x <= threshold left; XGBoost sends x < threshold left
+        self.strict = bool(strict)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names, dtype=object)
+        self.classes_ = np.array([0, 1])
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right,
+                                       self.default_left, self.value, self.roots, self.is_leaf))
+
+    # --- Inference ---
+    def _leaves(self, X):
+        """Leaf node index for every (row, tree) pair; only pairs not yet at a leaf advance each step"""
+        n, n_features = X.shape
+        nodes = np.tile(self.roots, n)
+        rows = np.repeat(np.arange(n), len(self.roots))
+        flat = X.ravel()
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            node = nodes[active]
+            x = flat[rows[active] * n_features + self.feature[node]]
+            thr = self.threshold[node]
+            go_left = x < thr if self.strict else x <= thr
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+            nodes[active] = node
+            active = active[~self.is_leaf[node]]
+        return nodes.reshape(n, len(self.roots))
+
+    def predict_positive(self, X):
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names_in_ is not None:
+                X = X[list(self.feature_names_in_)]
+            X = X.to_numpy()
+        # Both libraries compare float32 feature values against the split thresholds
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float32), dtype=np.float64)
+
+        out = np.empty(len(X))
+        for start in range(0, len(X), BATCH_ROWS):
+            leaf_values = self.value[self._leaves(X[start:start + BATCH_ROWS])]
+            if self.link == 'mean':
+                out[start:start + BATCH_ROWS] = leaf_values.mean(axis=1)
+            else:
+                margin = leaf_values.sum(axis=1) + self.base_margin
+                out[start:start + BATCH_ROWS] = 1.0 / (1.0 + np.exp(-margin))
+        return out
+
+    def predict_proba(self, X):
+        p = self.predict_positive(X)
+        return np.column_stack([1.0 - p, p])
+
+    # --- Persistence ---
+    def save(self, path):
+        np.savez(
+            path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            default_left=self.default_left, value=self.value, roots=self.roots,
+            meta=np.array(json.dumps({
+                'max_depth': self.max_depth, 'link': self.link, 'base_margin': self.base_margin,
+                'strict': self.strict,
+                'feature_names': None if self.feature_names_in_ is None else list(self.feature_names_in_),
+            }))
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(
+                data['feature'], data['threshold'], data['left'], data['right'], data['default_left'],
+                data['value'], data['roots'], meta['max_depth'], meta['link'], meta['base_margin'],
+                meta['strict'], meta['feature_names']
+            )
+
+
+def _stack(trees):
+    """Concatenate per-tree node arrays into one table with absolute, self-looping child indices"""
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    offset = 0
+    for t in trees:
+        n = len(t['feature'])
+        is_leaf = t['left'] < 0
+        idx = np.arange(n) + offset
+        feature.append(np.where(is_leaf, 0, t['feature']))
+        threshold.append(np.where(is_leaf, np.inf, t['threshold']))
+        left.append(np.where(is_leaf, idx, t['left'] + offset))
+        right.append(np.where(is_leaf, idx, t['right'] + offset))
+        default_left.append(np.where(is_leaf, True, t['default_left']))
+        value.append(t['value'])
+        roots.append(offset)
+        offset += n
+    return [np.concatenate(a) for a in (feature, threshold, left, right, default_left, value)] + [np.array(roots)]
+
+
+def compile_random_forest(model):
+    trees = []
+    for est in model.estimators_:
+        tree = est.tree_
+        counts = tree.value[:, 0, :]
+        trees.append({
+            'feature': tree.feature, 'threshold': tree.threshold,
+            'left': tree.children_left, 'right': tree.children_right,
+            'default_left': np.ones(tree.node_count, dtype=bool),
+            # Leaf class-1 probability (normalized, as DecisionTreeClassifier.predict_proba)
+            'value': counts[:, 1] / counts.sum(axis=1),
+        })
+    max_depth = max(est.tree_.max_depth for est in model.estimators_)
+    return CompiledTrees(*_stack(trees), max_depth=max_depth, link='mean',
+                         feature_names=getattr(model, 'feature_names_in_', None))
+
+
+def compile_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective: {learner['objective']['name']}")
+
+    trees, max_depth = [], 0
+    for t in learner['gradient_booster']['model']['trees']:
+        left = np.array(t['left_children'])
+        is_leaf = left < 0
+        trees.append({
+            'feature': np.array(t['split_indices']),
+            # Split values are stored as float32; leaves keep their weight in split_conditions
+            'threshold': np.array(t['split_conditions'], dtype=np.float32).astype(np.float64),
+            'left': left, 'right': np.array(t['right_children']),
+            'default_left': np.array(t['default_left'], dtype=bool),
+            'value': np.where(is_leaf, np.array(t['split_conditions'], dtype=np.float32), 0.0),
+        })
+        max_depth = max(max_depth, _depth(left, np.array(t['right_children'])))
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    base_margin = np.log(base_score / (1.0 - base_score))
+    return CompiledTrees(*_stack(trees), max_depth=max_depth, link='logistic', base_margin=base_margin,
+                         strict=True, feature_names=booster.feature_names)
+
+
+def _depth(left, right):
+    depth, frontier = 0, [0]
+    while frontier:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c >= 0]
+        depth += bool(frontier)
+    return depth
+
+
+def compile_model(model):
+    if hasattr(model, 'get_booster'):
+        return compile_xgboost(model)
+    if hasattr(model, 'estimators_'):
+        return compile_random_forest(model)
+    raise ValueError(f"Cannot compile model of type {type(model).__name__}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a pickled tree ensemble to compiled node arrays")
+    parser.add_argument("--model", default="random_forest.pkl")
+    parser.add_argument("--output", help="Defaults to models/<model>.npz")
+    args = parser.parse_args()
+
+    model = joblib.load(os.path.join(MODEL_DIR, args.model))
+    compiled = compile_model(model)
+    output = args.output or os.path.join(MODEL_DIR, os.path.splitext(args.model)[0] + ".npz")
+    compiled.save(output)
+    print(f"Compiled {len(compiled.roots)} trees ({len(compiled.feature):,} nodes, "
+          f"depth {compiled.max_depth}) -> {output} ({os.path.getsize(output) / 1024:.0f} KiB)")
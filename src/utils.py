@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from claim_state import ClaimRecord
 
 # --- Floating Chatbot Button CSS ---
 FLOATING_CSS = """
@@ -80,19 +81,25 @@ FIELD_MAPPINGS = {
     'property damage': 'property_damage'
 }
 
-def generate_chatbot_response(prompt, df, prob, drivers):
+def generate_chatbot_response(prompt, claim, prob, drivers, what_if=None):
     """Generate precise, context-aware chatbot responses"""
-    if df is None:
+    if claim is None:
         return "Please analyze a claim first to get specific insights."
     
     p = prompt.lower()
     
+    # 0. What-if scenarios (checked first so 'what if the police report...' isn't read as a field lookup)
+    if any(x in p for x in ['what if', 'what-if', 'scenario', 'sensitivity']):
+        if what_if:
+            return what_if
+        return "Run a sweep in the **What-If Analysis** panel and I can summarize how the risk changes."
+    
     # 1. Check for specific field queries
     for keyword, col in FIELD_MAPPINGS.items():
         # Check if keyword (e.g., "incident date") is in prompt
         if keyword in p:
              try:
-                 val = df[col].iloc[0]
+                 val = claim.get(col)
                  # Smart Formatting
                  if isinstance(val, (int, float)) and ('claim' in keyword or 'premium' in keyword or 'deductible' in keyword or 'limit' in keyword):
                      formatted_val = f"${val:,.2f}"
@@ -133,90 +140,59 @@ def process_submission(
     witnesses, police_report, property_damage,
     insured_sex, insured_education_level, insured_occupation,
     umbrella_limit, capital_gains, capital_loss, incident_hour, num_vehicles, bodily_injuries,
-    encoders
+    encoders, velocity_store=None, model_version=None
 ):
-    # Construct DataFrame
-    input_data = {
-        'months_as_customer': [months_as_customer],
-        'age': [age],
-        'policy_bind_date': [pd.to_datetime(policy_bind_date)],
-        'policy_state': [policy_state],
-        'policy_deductable': [policy_deductable],
-        'policy_annual_premium': [policy_annual_premium],
-        'umbrella_limit': [umbrella_limit],
-        'insured_sex': [insured_sex],
-        'insured_education_level': [insured_education_level],
-        'insured_occupation': [insured_occupation],
-        'insured_hobbies': ['sleeping'],
-        'insured_relationship': ['husband'],
-        'capital-gains': [capital_gains],
-        'capital-loss': [capital_loss],
-        'incident_date': [pd.to_datetime(incident_date)],
-        'incident_type': [incident_type],
-        'collision_type': [collision_type],
-        'incident_severity': [incident_severity],
-        'authorities_contacted': [authorities_contacted],
-        'incident_state': [state],
-        'incident_city': [city],
-        'incident_hour_of_the_day': [incident_hour],
-        'number_of_vehicles_involved': [num_vehicles],
-        'property_damage': [property_damage],
-        'bodily_injuries': [bodily_injuries],
-        'witnesses': [witnesses],
-        'police_report_available': [police_report],
-        'total_claim_amount': [total_claim_amount],
-        'injury_claim': [injury_claim],
-        'property_claim': [property_claim],
-        'vehicle_claim': [vehicle_claim],
-        'auto_make': [auto_make],
-        'auto_model': [auto_model],
-        'auto_year': [auto_year]
-    }
-    
-    df_input = pd.DataFrame(input_data)
+    # Build compact claim record (DataFrame views are derived on demand)
+    claim = ClaimRecord(
+        months_as_customer=months_as_customer,
+        age=age,
+        policy_bind_date=pd.to_datetime(policy_bind_date),
+        policy_state=policy_state,
+        policy_deductable=policy_deductable,
+        policy_annual_premium=policy_annual_premium,
+        umbrella_limit=umbrella_limit,
+        insured_sex=insured_sex,
+        insured_education_level=insured_education_level,
+        insured_occupation=insured_occupation,
+        insured_hobbies='sleeping',
+        insured_relationship='husband',
+        capital_gains=capital_gains,
+        capital_loss=capital_loss,
+        incident_date=pd.to_datetime(incident_date),
+        incident_type=incident_type,
+        collision_type=collision_type,
+        incident_severity=incident_severity,
+        authorities_contacted=authorities_contacted,
+        incident_state=state,
+        incident_city=city,
+        incident_hour_of_the_day=incident_hour,
+        number_of_vehicles_involved=num_vehicles,
+        property_damage=property_damage,
+        bodily_injuries=bodily_injuries,
+        witnesses=witnesses,
+        police_report_available=police_report,
+        total_claim_amount=total_claim_amount,
+        injury_claim=injury_claim,
+        property_claim=property_claim,
+        vehicle_claim=vehicle_claim,
+        auto_make=auto_make,
+        auto_model=auto_model,
+        auto_year=auto_year
+    )
     
-    # Feature Engineering
-    df_input['days_since_policy_bind'] = (df_input['incident_date'] - df_input['policy_bind_date']).dt.days
-    df_input['incident_month'] = df_input['incident_date'].dt.month
-    df_input['incident_day_of_week'] = df_input['incident_date'].dt.dayofweek
-    
-    if total_claim_amount > 0:
-        df_input['injury_claim_ratio'] = injury_claim / total_claim_amount
-        df_input['property_claim_ratio'] = property_claim / total_claim_amount
-        df_input['vehicle_claim_ratio'] = vehicle_claim / total_claim_amount
-    else:
-        df_input['injury_claim_ratio'] = 0
-        df_input['property_claim_ratio'] = 0
-        df_input['vehicle_claim_ratio'] = 0
-
-    drop_cols = ['policy_number', 'policy_csl', 'insured_zip', 'incident_location', '_c39', 'policy_bind_date', 'incident_date']
-    df_model_input = df_input.drop([c for c in drop_cols if c in df_input.columns], axis=1, errors='ignore')
+    # Velocity features from prior claims sharing city / vehicle / bind week, then record this one
+    if velocity_store is not None:
+        claim.velocity = velocity_store.observe(claim)
     
     # Encode Categoricals
-    cat_cols = df_model_input.select_dtypes(include=['object']).columns
-    
-    if encoders:
-        for col in cat_cols:
-            if col in encoders:
-                le = encoders[col]
-                try:
-                    # Handle '?' inputs -> 'nan' -> text
-                    df_model_input[col] = df_model_input[col].apply(lambda x: 'nan' if x == '?' else str(x))
-                    
-                    # Transform (handle unseen)
-                    df_model_input[col] = df_model_input[col].map(lambda x: le.transform([x])[0] if x in le.classes_ else 0)
-                except Exception:
-                    df_model_input[col] = 0
+    claim.encode(encoders)
     
-    # Save preprocessed data and metadata to session state
+    # Save the claim record to session state
     st.session_state['analysis_done'] = True
-    st.session_state['df_input'] = df_input
-    st.session_state['df_model_input'] = df_model_input  # Store preprocessed data
-    st.session_state['police_report'] = police_report
-    st.session_state['incident_severity'] = incident_severity
-    st.session_state['witnesses'] = witnesses
-    st.session_state['incident_type'] = incident_type
-    st.session_state['total_claim_amount'] = total_claim_amount
+    st.session_state['claim'] = claim
+    # Pin the model version the claim was encoded with until the next assessment
+    if model_version is not None:
+        st.session_state['model_version'] = model_version
     
     # Change Page
     st.session_state.page = 'result'
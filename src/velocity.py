@@ -0,0 +1,326 @@
+import hashlib
+import json
+import os
+import threading
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# --- Velocity Features ---
+# Sliding-window counts and claim-amount sums of *prior* claims that share a key
+# with the current claim, over its incident date. Fraud rings show up as bursts
+# on the same city, the same vehicle or policies bound in the same week.
+VELOCITY_STATE = "data/velocity_state.pkl"
+# Live claims since the last snapshot, one JSON line each, replayed on load
+VELOCITY_LOG_SUFFIX = ".log"
+
+VELOCITY_KEYS = {
+    'city': ('incident_city',),
+    'state': ('incident_state',),
+    'vehicle': ('auto_make', 'auto_model'),
+    'bind_week': ('policy_bind_week',),
+}
+VELOCITY_WINDOWS = (7, 30)
+
+VELOCITY_COLUMNS = tuple(
+    f"{key}_{stat}_{window}d"
+    for key in VELOCITY_KEYS for window in VELOCITY_WINDOWS for stat in ('claims', 'amount')
+)
+
+# Burst rule: the short window holds at least BURST_MIN_CLAIMS prior claims and at
+# least BURST_RATIO times its share of the long window (the key's normal rate).
+BURST_KEYS = ('city', 'vehicle', 'bind_week')
+BURST_MIN_CLAIMS = 3
+BURST_RATIO = 2.0
+
+# History kept per key behind its newest claim, for claims that arrive out of
+# incident-date order. Batch backfills over date-ordered input can pass the
+# longest window instead to keep memory flat.
+RETENTION_DAYS = 3 * 365
+
+SAVE_EVERY = 25  # live updates between state snapshots (the log covers the claims in between)
+
+# Fields that identify a live claim, so re-submitting it is not counted twice. The
+# incident fields keep different claims on the same policy defaults and day apart.
+IDENTITY_COLUMNS = (
+    'policy_bind_date', 'policy_state', 'policy_deductable', 'policy_annual_premium', 'umbrella_limit',
+    'insured_sex', 'insured_education_level', 'insured_occupation', 'age',
+    'incident_date', 'incident_hour_of_the_day', 'incident_type', 'incident_state', 'incident_city',
+    'auto_make', 'auto_model', 'auto_year',
+    'total_claim_amount', 'injury_claim', 'property_claim', 'vehicle_claim',
+)
+
+
+class WindowCounter:
+    """Claim count and amount over the last `window` days, in daily buckets.
+
+    Running totals cover the window ending on the newest recorded day, so
+    in-order reads and writes are O(1) amortized. Reads at any other day sum
+    at most `window` buckets and never drop history. Buckets are only
+    dropped once they fall `retention` days behind the newest recorded day,
+    so claims arriving out of incident-date order still see their neighbours.
+    """
+    __slots__ = ('window', 'retention', 'days', 'newest', 'count', 'amount')
+
+    def __init__(self, window, retention=None):
+        self.window = window
+        self.retention = max(retention or window, window)
+        self.days = {}  # day -> [count, amount]
+        self.newest = None
+        self.count = 0  # totals over (newest - window, newest]
+        self.amount = 0.0
+
+    def _sum(self, first, last):
+        """(count, amount) of buckets with first <= day <= last"""
+        count, amount = 0, 0.0
+        if last - first + 1 <= len(self.days):
+            buckets = (self.days.get(d) for d in range(first, last + 1))
+        else:
+            buckets = (b for d, b in self.days.items() if first <= d <= last)
+        for bucket in buckets:
+            if bucket is not None:
+                count += bucket[0]
+                amount += bucket[1]
+        return count, amount
+
+    def query(self, day):
+        """(count, amount) of claims in (day - window, day]"""
+        if self.newest is None:
+            return 0, 0.0
+        if day == self.newest:
+            return self.count, self.amount
+        if self.newest < day < self.newest + self.window:
+            # Slide the running totals forward: drop the days leaving the window
+            count, amount = self._sum(self.newest - self.window + 1, day - self.window)
+            return self.count - count, self.amount - amount
+        return self._sum(day - self.window + 1, day)
+
+    def _drop(self, first, last):
+        if last - first + 1 <= len(self.days):
+            for d in range(first, last + 1):
+                self.days.pop(d, None)
+        else:
+            for d in [d for d in self.days if first <= d <= last]:
+                del self.days[d]
+
+    def add(self, day, amount):
+        if self.newest is not None and day <= self.newest - self.retention:
+            return  # behind the retained history
+        if self.newest is None or day > self.newest:
+            self.count, self.amount = self.query(day)
+            if self.newest is not None:
+                self._drop(self.newest - self.retention + 1, day - self.retention)
+            self.newest = day
+        if day > self.newest - self.window:
+            self.count += 1
+            self.amount += amount
+        bucket = self.days.get(day)
+        if bucket is None:
+            self.days[day] = [1, amount]
+        else:
+            bucket[0] += 1
+            bucket[1] += amount
+
+
+EPOCH = pd.Timestamp('1970-01-01')
+
+
+def _day(value):
+    return (pd.Timestamp(value) - EPOCH).days
+
+
+def _bind_week(bind_date):
+    iso = pd.Timestamp(bind_date).isocalendar()
+    return f"{iso[0]}-W{iso[1]:02d}"
+
+
+def claim_identity(claim):
+    """Stable hash of the policy fields and incident date of a claim"""
+    values = []
+    for column in IDENTITY_COLUMNS:
+        value = claim[column]
+        values.append(str(pd.Timestamp(value).date()) if column.endswith('_date') else str(value))
+    return hashlib.sha1('\x1f'.join(values).encode()).hexdigest()
+
+
+def _key_values(claim):
+    """[(key name, tuple of values)] for a mapping with raw claim columns"""
+    keys = []
+    for name, columns in VELOCITY_KEYS.items():
+        if name == 'bind_week':
+            keys.append((name, (_bind_week(claim['policy_bind_date']),)))
+        else:
+            keys.append((name, tuple(str(claim[c]) for c in columns)))
+    return keys
+
+
+class VelocityStore:
+    """Per-key sliding-window counters, persisted between runs with joblib.
+
+    Live claims are also appended to a log next to the snapshot, so claims
+    recorded since the last snapshot survive a restart.
+    """
+
+    def __init__(self, path=VELOCITY_STATE, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.log_path = path + VELOCITY_LOG_SUFFIX
+        self.retention_days = retention_days
+        self.counters = {}  # (key name, key values, window) -> WindowCounter
+        self.newest_day = None
+        self.seen = {}  # claim identity -> (day, amount, keys) of live claims inside the retained history
+        self.updates = 0
+        self._lock = threading.Lock()  # live updates come from many Streamlit sessions
+
+    @classmethod
+    def load(cls, path=VELOCITY_STATE):
+        store = cls(path)
+        if os.path.exists(path):
+            state = joblib.load(path)
+            counters, newest_day = state[:2]
+            if all(hasattr(c, 'days') for c in counters.values()):
+                store.counters, store.newest_day = counters, newest_day
+                if len(state) > 2:
+                    store.seen = state[2]
+            else:
+                warnings.warn(f"Velocity state {path} uses an older counter layout; "
+                              "re-run model_train.py to re-seed it. Starting from empty counters")
+        store._replay_log()
+        return store
+
+    def _replay_log(self):
+        """Record logged live claims missing from the snapshot (claims already in it are skipped by identity)"""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                if entry['id'] not in self.seen:
+                    keys = [(name, tuple(values)) for name, values in entry['keys']]
+                    self._record_at(entry['day'], entry['amount'], keys)
+                    self.seen[entry['id']] = (entry['day'], entry['amount'], keys)
+
+    def save(self):
+        """Snapshot the counters atomically and truncate the log"""
+        if self.newest_day is not None:
+            horizon = self.newest_day - self.retention_days
+            self.seen = {k: v for k, v in self.seen.items() if v[0] > horizon}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        joblib.dump((self.counters, self.newest_day, self.seen), tmp_path)
+        os.replace(tmp_path, self.path)
+        open(self.log_path, "w").close()
+
+    def _append_log(self, identity, day, amount, keys):
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps({'id': identity, 'day': int(day), 'amount': amount, 'keys': keys}) + "\n")
+
+    def _features_at(self, day, keys):
+        out = {}
+        for name, values in keys:
+            for window in VELOCITY_WINDOWS:
+                counter = self.counters.get((name, values, window))
+                count, amount = counter.query(day) if counter else (0, 0.0)
+                out[f"{name}_claims_{window}d"] = count
+                out[f"{name}_amount_{window}d"] = amount
+        return out
+
+    def _record_at(self, day, amount, keys):
+        for name, values in keys:
+            for window in VELOCITY_WINDOWS:
+                key = (name, values, window)
+                counter = self.counters.get(key)
+                if counter is None:
+                    counter = self.counters[key] = WindowCounter(window, self.retention_days)
+                counter.add(day, amount)
+        if self.newest_day is None or day > self.newest_day:
+            self.newest_day = day
+        self.updates += 1
+
+    def features(self, claim):
+        """Velocity features for a claim from prior claims only (does not record it)"""
+        return self._features_at(_day(claim['incident_date']), _key_values(claim))
+
+    def record(self, claim):
+        """Add a claim to every window it belongs to: O(keys x windows)"""
+        self._record_at(_day(claim['incident_date']), float(claim['total_claim_amount']), _key_values(claim))
+
+    def observe(self, claim, autosave=True):
+        """Live mode: features from prior claims, then record the claim.
+
+        A claim already recorded (same claim_identity) is not recorded again,
+        and its own earlier record is left out of its features.
+        """
+        day, keys = _day(claim['incident_date']), _key_values(claim)
+        identity = claim_identity(claim)
+        with self._lock:
+            out = self._features_at(day, keys)
+            recorded = self.seen.get(identity)
+            if recorded is not None:
+                # Same identity means same incident day, so the earlier record sits in every window
+                _, amount, recorded_keys = recorded
+                for name, values in keys:
+                    if (name, values) in recorded_keys:
+                        for window in VELOCITY_WINDOWS:
+                            out[f"{name}_claims_{window}d"] -= 1
+                            out[f"{name}_amount_{window}d"] -= amount
+                return out
+            amount = float(claim['total_claim_amount'])
+            self._record_at(day, amount, keys)
+            self.seen[identity] = (day, amount, keys)
+            self._append_log(identity, day, amount, keys)
+            if autosave and self.updates % SAVE_EVERY == 0:
+                self.save()
+        return out
+
+    def backfill(self, df):
+        """Backfill mode: the same features for a frame of historical claims, replayed in incident-date order"""
+        incident = pd.to_datetime(df['incident_date'])
+        bind = pd.to_datetime(df['policy_bind_date']).dt.isocalendar()
+        columns = {
+            'city': df['incident_city'].astype(str),
+            'state': df['incident_state'].astype(str),
+            'vehicle': df['auto_make'].astype(str) + '\0' + df['auto_model'].astype(str),
+            'bind_week': bind['year'].astype(str) + '-W' + bind['week'].astype(str).str.zfill(2),
+        }
+        days = (incident - EPOCH).dt.days.to_numpy()
+        amounts = df['total_claim_amount'].to_numpy(dtype=np.float64)
+        key_rows = zip(*(
+            [(name, tuple(v.split('\0'))) for v in columns[name]] if name == 'vehicle' else [(name, (v,)) for v in columns[name]]
+            for name in VELOCITY_KEYS
+        ))
+        key_rows = list(key_rows)
+
+        features = [None] * len(df)
+        for i in np.argsort(days, kind='stable'):
+            features[i] = self._features_at(days[i], key_rows[i])
+            self._record_at(days[i], amounts[i], key_rows[i])
+        return pd.DataFrame(features, columns=list(VELOCITY_COLUMNS), index=df.index)
+
+
+def burst_keys(features):
+    """Names of BURST_KEYS whose short window bursts above the key's normal rate"""
+    short, long = VELOCITY_WINDOWS[0], VELOCITY_WINDOWS[-1]
+    bursts = []
+    for key in BURST_KEYS:
+        recent = features[f"{key}_claims_{short}d"]
+        baseline = features[f"{key}_claims_{long}d"] * short / long
+        if recent >= BURST_MIN_CLAIMS and recent >= BURST_RATIO * baseline:
+            bursts.append(key)
+    return bursts
+
+
+def burst_flags(df):
+    """Vectorized burst_keys: one boolean column per BURST_KEYS entry"""
+    short, long = VELOCITY_WINDOWS[0], VELOCITY_WINDOWS[-1]
+    flags = {}
+    for key in BURST_KEYS:
+        recent = df[f"{key}_claims_{short}d"]
+        baseline = df[f"{key}_claims_{long}d"] * short / long
+        flags[key] = (recent >= BURST_MIN_CLAIMS) & (recent >= BURST_RATIO * baseline)
+    return pd.DataFrame(flags, index=df.index)
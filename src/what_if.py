@@ -0,0 +1,124 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from claim_state import ENGINEERED_COLUMNS, engineer_features, encode_frame
+from risk import get_risk_driver_flags, assess_risk_batch
+
+# --- What-If Features ---
+# Label -> (column, kind). Numeric grids are built from a range; categorical
+# grids use the listed values (the same choices the input form offers).
+WHAT_IF_FEATURES = {
+    'Total Claim Amount': ('total_claim_amount', 'numeric'),
+    'Witnesses': ('witnesses', 'numeric'),
+    'Incident Hour': ('incident_hour_of_the_day', 'numeric'),
+    'Police Report': ('police_report_available', ["YES", "NO", "?"]),
+    'Severity': ('incident_severity', ["Minor Damage", "Total Loss", "Major Damage", "Trivial Damage"]),
+    'Authorities': ('authorities_contacted', ["Police", "Fire", "Ambulance", "Other", "None"]),
+}
+
+# Fixed sweep ranges for integer features; the claim amount sweeps 0 to twice its value
+NUMERIC_RANGES = {
+    'witnesses': (0, 10),
+    'incident_hour_of_the_day': (0, 23),
+}
+
+CLAIM_PARTS = ('injury_claim', 'property_claim', 'vehicle_claim')
+MAX_VARIANTS = 2500
+
+
+def numeric_grid(low, high, points, integer=False):
+    grid = np.linspace(low, high, points)
+    return np.unique(np.round(grid)) if integer else grid
+
+
+def default_grid(claim, label, points=100):
+    """(column, values) to sweep for a WHAT_IF_FEATURES label"""
+    column, kind = WHAT_IF_FEATURES[label]
+    if kind != 'numeric':
+        return column, list(kind)
+    if column == 'total_claim_amount':
+        return column, numeric_grid(0, max(2 * claim.total_claim_amount, 10000), points)
+    low, high = NUMERIC_RANGES[column]
+    return column, numeric_grid(low, high, points, integer=True)
+
+
+def what_if_grid(claim, labels, points):
+    """{column: values} for the selected labels, with the first label's points cut so the grid fits MAX_VARIANTS.
+
+    Later labels get points // 10 (at least 2); integer and categorical grids
+    have a fixed size, so only the first label is shrunk.
+    """
+    others = dict(default_grid(claim, label, max(2, points // 10)) for label in labels[1:])
+    fixed = int(np.prod([len(values) for values in others.values()]))
+    column, values = default_grid(claim, labels[0], min(points, MAX_VARIANTS // fixed))
+    return {column: values, **others}
+
+
+def build_variants(claim, grid):
+    """Raw claim frame with one row per combination of the {column: values} grid"""
+    columns = list(grid)
+    combos = list(itertools.product(*(grid[c] for c in columns)))
+    if len(combos) > MAX_VARIANTS:
+        raise ValueError(f"What-if grid has {len(combos)} variants (max {MAX_VARIANTS})")
+
+    base = claim.input_frame().drop(columns=list(ENGINEERED_COLUMNS))
+    variants = base.loc[base.index.repeat(len(combos))].reset_index(drop=True)
+    for i, column in enumerate(columns):
+        values = pd.Series([combo[i] for combo in combos])
+        if column == 'total_claim_amount':
+            # Scale the claim components with the total so the ratios stay consistent
+            scale = values / claim.total_claim_amount if claim.total_claim_amount else 0
+            for part in CLAIM_PARTS:
+                variants[part] = variants[part].astype(np.float64) * scale
+        variants[column] = values.to_numpy()
+    return variants
+
+
+def run_what_if(claim, grid, model, encoders):
+    """Score every grid variant of the claim in one predict_proba call"""
+    variants = engineer_features(build_variants(claim, grid))
+    probabilities = model.predict_proba(encode_frame(variants, encoders))[:, 1]
+    num_drivers = get_risk_driver_flags(variants).sum(axis=1).to_numpy()
+
+    result = variants[list(grid)].copy()
+    result['probability'] = probabilities
+    result['num_drivers'] = num_drivers
+    result['risk_label'] = assess_risk_batch(probabilities, num_drivers)
+    return result
+
+
+def compact_result(result, grid):
+    """Session-sized copy of a sweep: the grid values and a float32 probability per variant"""
+    return {
+        'grid': {column: np.asarray(values) for column, values in grid.items()},
+        'probability': result['probability'].to_numpy(dtype=np.float32),
+    }
+
+
+def chart_data(compact):
+    """Probability curve (one column) or table (two columns) over the grid, rebuilt from compact_result"""
+    columns, values = list(compact['grid']), list(compact['grid'].values())
+    index = pd.Index(values[0], name=columns[0])
+    if len(columns) == 1:
+        return pd.Series(compact['probability'], index=index, name='probability')
+    # Variants are itertools.product rows, so the first column varies slowest
+    return pd.DataFrame(compact['probability'].reshape(len(values[0]), len(values[1])),
+                        index=index, columns=pd.Index(values[1], name=columns[1]))
+
+
+def summarize_what_if(result, labels):
+    """Plain-text summary of a what-if sweep for the chatbot"""
+    columns = [c for c in result.columns if c in labels]
+    lo = result.loc[result['probability'].idxmin()]
+    hi = result.loc[result['probability'].idxmax()]
+
+    def describe(row):
+        return ", ".join(f"{labels[c]} = {row[c]:,.0f}" if isinstance(row[c], (int, float, np.number)) else f"{labels[c]} = {row[c]}" for c in columns)
+
+    return (
+        f"Across {len(result)} what-if scenarios varying {' and '.join(labels[c] for c in columns)}, "
+        f"fraud probability ranges from **{lo['probability']:.1%}** ({describe(lo)}; {lo['risk_label']}) "
+        f"to **{hi['probability']:.1%}** ({describe(hi)}; {hi['risk_label']})."
+    )